@@ -0,0 +1,33 @@
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '5c1f7a9e2d43'
+down_revision: Union[str, Sequence[str], None] = '377e4b3244b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY keeps trips/tasks writable while the indexes build; it cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_trips_user_id_start_date',
+            'trips',
+            ['user_id', sa.text('start_date DESC')],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_tasks_trip_id_task_id',
+            'tasks',
+            ['trip_id', 'task_id'],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_tasks_trip_id_task_id', table_name='tasks', postgresql_concurrently=True)
+        op.drop_index('ix_trips_user_id_start_date', table_name='trips', postgresql_concurrently=True)
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+from typing import Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import BotCommand, BotCommandScopeDefault
+
+from app.config import settings
+from app.database.pool import pool_stats
+from app.database.session import SessionLocal
+from app.repositories.trips import destination_cache
+from app.middlewares import DbSessionMiddleware, HandlerMetricsMiddleware, ProfilingMiddleware, UpdateMetricsMiddleware
+from app.services.cache import CacheSweeper
+from app.services.geocode import GeocodeStore, seed_from_geonames
+from app.services.http import HttpClient
+from app.services.outbox import SendScheduler
+from app.services.prefetch import PrefetchScheduler
+from app.services.refresh import BackgroundRefresher
+from app.services.weather import WeatherService
+from app.utils.profiling import Profiler
+from app.web.metrics import register_runtime_metrics, start_metrics_server
+from app.services.points_of_interest import PointsOfInterestService
+from app.handlers.start import router as start_router
+from app.handlers.common import router as common_router
+from app.handlers.admin import router as admin_router
+from app.handlers.trips import router as trips_router
+from app.handlers.tasks import router as tasks_router
+from app.handlers.weather import router as weather_router
+from app.handlers.points_of_interest import router as poi_router
+from app.handlers.city_selection import router as city_selection_router
+
+logger = logging.getLogger(__name__)
+
+
+async def set_bot_commands(bot: Bot):
+    commands = [
+        BotCommand(command="start", description="🚀 Запустить бота"),
+        BotCommand(command="new_trip", description="🏝️ Создать новую поездку"),
+        BotCommand(command="my_trips", description="🗺️ Мои поездки"),
+        BotCommand(command="add_task", description="📋 Добавить задачу"),
+        BotCommand(command="tasks", description="✅ Мои задачи"),
+        BotCommand(command="weather", description="🌤️ Текущая погода"),
+        BotCommand(command="forecast", description="📅 Прогноз погоды"),
+        BotCommand(command="top_location", description="🏛️ Достопримечательности"),
+    ]
+
+    await bot.set_my_commands(commands, scope=BotCommandScopeDefault())
+
+
+def include_routers(dp: Dispatcher):
+    dp.include_router(start_router)
+    dp.include_router(common_router)
+    dp.include_router(admin_router)
+    dp.include_router(trips_router)
+    dp.include_router(tasks_router)
+    dp.include_router(city_selection_router)
+    dp.include_router(weather_router)
+    dp.include_router(poi_router)
+
+
+def used_update_types() -> list:
+    # for processes that route updates without registering the handlers themselves
+    probe = Dispatcher()
+    include_routers(probe)
+    return probe.resolve_used_update_types()
+
+
+def create_storage() -> BaseStorage:
+    if settings.REDIS_URL:
+        # optional dependency, only needed when FSM state is shared between processes
+        from aiogram.fsm.storage.redis import RedisStorage
+
+        return RedisStorage.from_url(settings.REDIS_URL)
+    return MemoryStorage()
+
+
+def seed_geocode_store():
+    if not settings.GEONAMES_DUMP_PATH:
+        return
+    store = GeocodeStore(settings.GEOCODE_DB_PATH)
+    try:
+        seeded = store.is_seeded()
+    finally:
+        store.close()
+    if not seeded:
+        seed_from_geonames(settings.GEOCODE_DB_PATH, settings.GEONAMES_DUMP_PATH)
+
+
+class BotRuntime:
+    def __init__(self, bot: Bot):
+        self.bot = bot
+        self.sender = SendScheduler(global_rate=settings.SEND_GLOBAL_RATE / settings.sending_processes())
+        bot.session.middleware(self.sender)
+        self.http_client = HttpClient()
+        self.refresher = BackgroundRefresher(
+            concurrency=settings.CACHE_REFRESH_CONCURRENCY,
+            max_pending=settings.CACHE_REFRESH_MAX_PENDING,
+        )
+        self.geocode_store = GeocodeStore(settings.GEOCODE_DB_PATH)
+        self.weather_service = WeatherService(self.http_client, self.refresher)
+        self.poi_service = PointsOfInterestService(self.http_client, self.refresher, self.geocode_store)
+        self.profiler = Profiler(
+            settings.PROFILE_DIR,
+            sample_rate=settings.PROFILE_SAMPLE_RATE,
+            user_id=settings.PROFILE_USER_ID,
+            mode=settings.PROFILE_MODE,
+            interval=settings.PROFILE_SAMPLE_INTERVAL,
+        )
+        self.dp = Dispatcher(
+            storage=create_storage(),
+            weather_service=self.weather_service,
+            poi_service=self.poi_service,
+            profiler=self.profiler,
+        )
+        self.prefetcher = PrefetchScheduler(SessionLocal, self.weather_service, self.poi_service)
+        self.cache_sweeper = CacheSweeper(
+            [self.weather_service.sweep_cache, self.poi_service.sweep_cache, destination_cache.sweep],
+            settings.CACHE_SWEEP_INTERVAL,
+        )
+
+        self.db_middleware = DbSessionMiddleware()
+        self.dp.update.outer_middleware(UpdateMetricsMiddleware())
+        self.dp.update.outer_middleware(self.db_middleware)
+        self.dp.message.middleware(HandlerMetricsMiddleware())
+        self.dp.callback_query.middleware(HandlerMetricsMiddleware())
+        self.dp.message.middleware(ProfilingMiddleware(self.profiler))
+        self.dp.callback_query.middleware(ProfilingMiddleware(self.profiler))
+        include_routers(self.dp)
+        register_runtime_metrics(self)
+        self.metrics_runner = None
+
+    async def start(
+        self,
+        prefetch: bool = settings.PREFETCH_ENABLED,
+        metrics_port: Optional[int] = settings.METRICS_PORT if settings.METRICS_ENABLED else None,
+    ):
+        await asyncio.to_thread(seed_geocode_store)
+        if prefetch:
+            self.prefetcher.start()
+        self.cache_sweeper.start()
+        self.profiler.start()
+        if metrics_port is not None:
+            self.metrics_runner = await start_metrics_server(settings.METRICS_HOST, metrics_port)
+
+    async def close(self):
+        if self.metrics_runner is not None:
+            await self.metrics_runner.cleanup()
+        await self.prefetcher.stop()
+        await self.cache_sweeper.stop()
+        await self.profiler.stop()
+        await self.poi_service.close()
+        await self.refresher.close()
+        await self.http_client.close()
+        await self.dp.storage.close()
+        self.geocode_store.close()
+        await self.sender.close()
+        logger.info(f"Send queue stats: {self.sender.stats()}")
+        logger.info(f"DB pool stats: {pool_stats.snapshot()}, sessions: {self.db_middleware.tracker.snapshot()}")
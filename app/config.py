@@ -13,8 +13,114 @@ class Settings:
     FOURSQUARE_API_KEY: Optional[str] = os.getenv("FOURSQUARE_API_KEY")
     OPENTRIPMAP_API_KEY: Optional[str] = os.getenv("OPENTRIPMAP_API_KEY")
     DEEPSEEK_API_KEY: Optional[str] = os.getenv("DEEPSEEK_API_KEY")
+
+    OPENWEATHER_BASE_URL: str = os.getenv("OPENWEATHER_BASE_URL", "http://api.openweathermap.org/data/2.5")
+    FOURSQUARE_BASE_URL: str = os.getenv("FOURSQUARE_BASE_URL", "https://places-api.foursquare.com")
+    OPENTRIPMAP_BASE_URL: str = os.getenv("OPENTRIPMAP_BASE_URL", "https://api.opentripmap.com/0.1/en")
+    AMADEUS_BASE_URL: str = os.getenv("AMADEUS_BASE_URL", "https://test.api.amadeus.com/v1")
+
+    HTTP_POOL_LIMIT: int = int(os.getenv("HTTP_POOL_LIMIT", "100"))
+    HTTP_POOL_LIMIT_PER_HOST: int = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "20"))
+    HTTP_DNS_CACHE_TTL: int = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))
+    HTTP_KEEPALIVE_TIMEOUT: float = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))
+    HTTP_DEFAULT_TIMEOUT: float = float(os.getenv("HTTP_DEFAULT_TIMEOUT", "15"))
+    OPENWEATHER_TIMEOUT: float = float(os.getenv("OPENWEATHER_TIMEOUT", "10"))
+    FOURSQUARE_TIMEOUT: float = float(os.getenv("FOURSQUARE_TIMEOUT", "8"))
+    OPENTRIPMAP_TIMEOUT: float = float(os.getenv("OPENTRIPMAP_TIMEOUT", "8"))
+    AMADEUS_TIMEOUT: float = float(os.getenv("AMADEUS_TIMEOUT", "10"))
+    DEEPSEEK_TIMEOUT: float = float(os.getenv("DEEPSEEK_TIMEOUT", "20"))
+    AMADEUS_TOKEN_REFRESH_MARGIN: float = float(os.getenv("AMADEUS_TOKEN_REFRESH_MARGIN", "120"))
+
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_WAIT_WARNING: float = float(os.getenv("DB_POOL_WAIT_WARNING", "1"))
+    DB_SESSION_LEAK_TIMEOUT: float = float(os.getenv("DB_SESSION_LEAK_TIMEOUT", "60"))
+
+    CACHE_SWEEP_INTERVAL: float = float(os.getenv("CACHE_SWEEP_INTERVAL", "60"))
+    CACHE_REFRESH_CONCURRENCY: int = int(os.getenv("CACHE_REFRESH_CONCURRENCY", "4"))
+    CACHE_REFRESH_MAX_PENDING: int = int(os.getenv("CACHE_REFRESH_MAX_PENDING", "256"))
+    WEATHER_CACHE_TTL: float = float(os.getenv("WEATHER_CACHE_TTL", "600"))
+    WEATHER_CACHE_HARD_TTL: float = float(os.getenv("WEATHER_CACHE_HARD_TTL", "1800"))
+    WEATHER_CACHE_MAX_ENTRIES: int = int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", "5000"))
+    WEATHER_CACHE_MAX_BYTES: int = int(os.getenv("WEATHER_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+    WEATHER_CURRENT_FROM_FORECAST_WINDOW: float = float(os.getenv("WEATHER_CURRENT_FROM_FORECAST_WINDOW", "5400"))
+    POI_CACHE_TTL: float = float(os.getenv("POI_CACHE_TTL", "1800"))
+    POI_CACHE_HARD_TTL: float = float(os.getenv("POI_CACHE_HARD_TTL", "7200"))
+    POI_CACHE_MAX_ENTRIES: int = int(os.getenv("POI_CACHE_MAX_ENTRIES", "2000"))
+    POI_CACHE_MAX_BYTES: int = int(os.getenv("POI_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+    DESTINATION_CACHE_TTL: float = float(os.getenv("DESTINATION_CACHE_TTL", "600"))
+    DESTINATION_CACHE_MAX_ENTRIES: int = int(os.getenv("DESTINATION_CACHE_MAX_ENTRIES", "10000"))
+    KNOWN_USERS_MAX_ENTRIES: int = int(os.getenv("KNOWN_USERS_MAX_ENTRIES", "100000"))
+
+    GEOCODE_DB_PATH: str = os.getenv("GEOCODE_DB_PATH", "data/geocode.sqlite3")
+    GEONAMES_DUMP_PATH: Optional[str] = os.getenv("GEONAMES_DUMP_PATH")
+    GEOCODE_DB_TIMEOUT: float = float(os.getenv("GEOCODE_DB_TIMEOUT", "0.5"))
+
+    POI_STRATEGY: str = os.getenv("POI_STRATEGY", "sequential")
+    POI_HEDGE_DELAY: float = float(os.getenv("POI_HEDGE_DELAY", "1.5"))
+    POI_ADAPTIVE_ORDER: bool = os.getenv("POI_ADAPTIVE_ORDER", "true").lower() in ("1", "true", "yes")
+    POI_HEALTH_WINDOW: int = int(os.getenv("POI_HEALTH_WINDOW", "50"))
+    POI_HEALTH_MAX_AGE: float = float(os.getenv("POI_HEALTH_MAX_AGE", "300"))
+    POI_BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("POI_BREAKER_FAILURE_THRESHOLD", "3"))
+    POI_BREAKER_OPEN_SECONDS: float = float(os.getenv("POI_BREAKER_OPEN_SECONDS", "60"))
+
+    PREFETCH_ENABLED: bool = os.getenv("PREFETCH_ENABLED", "true").lower() in ("1", "true", "yes")
+    PREFETCH_INTERVAL: float = float(os.getenv("PREFETCH_INTERVAL", "900"))
+    PREFETCH_WINDOW_DAYS: int = int(os.getenv("PREFETCH_WINDOW_DAYS", "7"))
+    PREFETCH_BATCH_SIZE: int = int(os.getenv("PREFETCH_BATCH_SIZE", "500"))
+    PREFETCH_CONCURRENCY: int = int(os.getenv("PREFETCH_CONCURRENCY", "4"))
+    PREFETCH_RATE_PER_SECOND: float = float(os.getenv("PREFETCH_RATE_PER_SECOND", "2"))
+
+    SEND_GLOBAL_RATE: float = float(os.getenv("SEND_GLOBAL_RATE", "30"))
+    SEND_CHAT_RATE: float = float(os.getenv("SEND_CHAT_RATE", "1"))
+    SEND_CHAT_BURST: float = float(os.getenv("SEND_CHAT_BURST", "3"))
+    SEND_GROUP_RATE: float = float(os.getenv("SEND_GROUP_RATE", str(20 / 60)))
+    SEND_MERGE_MAX_CHARS: int = int(os.getenv("SEND_MERGE_MAX_CHARS", "1024"))
+    SEND_MAX_RETRIES: int = int(os.getenv("SEND_MAX_RETRIES", "3"))
+
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+    METRICS_HOST: str = os.getenv("METRICS_HOST", "0.0.0.0")
+    METRICS_PORT: int = int(os.getenv("METRICS_PORT", "9100"))
+
+    BOT_MODE: str = os.getenv("BOT_MODE", "polling")
+    REDIS_URL: Optional[str] = os.getenv("REDIS_URL")
+    WEBHOOK_URL: Optional[str] = os.getenv("WEBHOOK_URL")
+    WEBHOOK_PATH: str = os.getenv("WEBHOOK_PATH", "/webhook")
+    WEBHOOK_SECRET: Optional[str] = os.getenv("WEBHOOK_SECRET")
+    WEBHOOK_BACKLOG: int = int(os.getenv("WEBHOOK_BACKLOG", "1000"))
+    WEBHOOK_WORKERS: int = int(os.getenv("WEBHOOK_WORKERS", "16"))
+    WEBHOOK_PROCESSES: int = int(os.getenv("WEBHOOK_PROCESSES", "1"))
+    WEBHOOK_MAX_CONNECTIONS: int = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+    WEBAPP_HOST: str = os.getenv("WEBAPP_HOST", "0.0.0.0")
+    WEBAPP_PORT: int = int(os.getenv("WEBAPP_PORT", "8080"))
+
+    SHARD_COUNT: int = int(os.getenv("SHARD_COUNT", "4"))
+    SHARD_QUEUE_SIZE: int = int(os.getenv("SHARD_QUEUE_SIZE", "1000"))
+    SHARD_WORKERS: int = int(os.getenv("SHARD_WORKERS", "16"))
+    SHARD_HEALTH_INTERVAL: float = float(os.getenv("SHARD_HEALTH_INTERVAL", "30"))
+    SHARD_HEARTBEAT_TIMEOUT: float = float(os.getenv("SHARD_HEARTBEAT_TIMEOUT", "15"))
+
+    ADMIN_IDS: frozenset = frozenset(int(x) for x in os.getenv("ADMIN_IDS", "").split(",") if x.strip())
+    PROFILE_SAMPLE_RATE: float = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    PROFILE_USER_ID: Optional[int] = int(os.getenv("PROFILE_USER_ID")) if os.getenv("PROFILE_USER_ID") else None
+    PROFILE_MODE: str = os.getenv("PROFILE_MODE", "cprofile")
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", "profiles")
+    PROFILE_SAMPLE_INTERVAL: float = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+
+    def sending_processes(self) -> int:
+        # every process that handles updates sends replies on its own, Telegram's global limit is per bot
+        if self.BOT_MODE == "sharded":
+            return self.SHARD_COUNT
+        if self.BOT_MODE == "webhook":
+            return self.WEBHOOK_PROCESSES
+        return 1
+
     def validate(self):
         required_vars = ["BOT_TOKEN", "DATABASE_URL", "OPENWEATHER_API_KEY", "AMADEUS_API_KEY", "AMADEUS_API_SECRET","FOURSQUARE_API_KEY","OPENTRIPMAP_API_KEY"]
+        if self.BOT_MODE == "webhook":
+            required_vars += ["WEBHOOK_URL", "WEBHOOK_SECRET"]
         for var in required_vars:
             if not getattr(self, var):
                 raise ValueError(f"Missing required environment variable: {var}")
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Index
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .base import Base
 
@@ -20,10 +21,21 @@ class Trip(Base):
     end_date = Column(DateTime, nullable=False)
     notes = Column(Text)
 
+    __table_args__ = (
+        Index("ix_trips_user_id_start_date", user_id, start_date.desc()),
+    )
+
+    # loaded explicitly with selectinload, a lazy load under asyncio would be an N+1 anyway
+    tasks = relationship("Task", order_by="Task.task_id", lazy="raise", passive_deletes=True)
+
 class Task(Base):
     __tablename__ = "tasks"
 
     task_id = Column(Integer, primary_key=True, autoincrement=True)
     trip_id = Column(Integer, ForeignKey('trips.trip_id'))
     description = Column(Text, nullable=False)
-    is_completed = Column(Boolean, default=False)
\ No newline at end of file
+    is_completed = Column(Boolean, default=False)
+
+    __table_args__ = (
+        Index("ix_tasks_trip_id_task_id", trip_id, task_id),
+    )
\ No newline at end of file
@@ -0,0 +1,56 @@
+import contextvars
+import time
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.utils.metrics import registry
+
+QUERY_DURATION = registry.histogram(
+    "db_query_duration_seconds",
+    "Duration of single SQL statements by operation",
+    ["operation"],
+)
+
+
+class QueryStats:
+    __slots__ = ("count", "duration", "handler")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.handler = "unhandled"
+
+
+# set per update by the metrics middleware, engine events add to whatever is current
+current_queries: contextvars.ContextVar[Optional[QueryStats]] = contextvars.ContextVar(
+    "current_queries", default=None
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    QUERY_DURATION.observe(elapsed, operation=operation)
+    stats = current_queries.get()
+    if stats is not None:
+        stats.count += 1
+        stats.duration += elapsed
+
+
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
+
+
+def instrument_engine(engine: AsyncEngine):
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
@@ -0,0 +1,64 @@
+import asyncio
+
+from aiogram import Router, types, F
+from aiogram.filters import Command, CommandObject
+
+from app.config import settings
+from app.utils.profiling import Profiler
+
+router = Router()
+router.message.filter(F.from_user.id.in_(settings.ADMIN_IDS))
+
+PROFILE_HELP = (
+    "/profile — текущие настройки\n"
+    "/profile rate 0.05 — профилировать 5% обновлений\n"
+    "/profile user 12345 — все обновления пользователя (/profile me — свои)\n"
+    "/profile mode cprofile|sampling — cProfile или сэмплирование стеков\n"
+    "/profile off — выключить"
+)
+
+
+def describe_profiler(profiler: Profiler) -> str:
+    stats = profiler.stats()
+    state = "включено" if stats["enabled"] else "выключено"
+    return (
+        f"🔬 Профилирование {state}\n"
+        f"Режим: {stats['mode']}\n"
+        f"Доля обновлений: {stats['sample_rate']}\n"
+        f"Пользователь: {stats['user_id'] or 'нет'}\n"
+        f"Сохранено профилей: {stats['captured']}, пропущено: {stats['skipped']}\n"
+        f"Последний: {stats['last_path'] or 'нет'}\n"
+        f"Процесс {stats['pid']}: счётчики только этого процесса, "
+        f"остальные процессы подхватят настройки за {profiler.control_interval:g} с"
+    )
+
+
+@router.message(Command("profile"))
+async def cmd_profile(message: types.Message, command: CommandObject, profiler: Profiler):
+    args = (command.args or "").split()
+    try:
+        if not args:
+            pass
+        elif args[0] == "off":
+            profiler.disable()
+        elif args[0] == "me":
+            profiler.configure(user_id=message.from_user.id)
+        elif args[0] == "rate" and len(args) == 2:
+            profiler.configure(sample_rate=float(args[1]))
+        elif args[0] == "user" and len(args) == 2:
+            profiler.configure(user_id=None if args[1] == "off" else int(args[1]))
+        elif args[0] == "mode" and len(args) == 2:
+            profiler.configure(mode=args[1])
+        else:
+            await message.answer(PROFILE_HELP)
+            return
+    except ValueError as e:
+        await message.answer(f"❌ {e}\n\n{PROFILE_HELP}")
+        return
+    if args:
+        try:
+            await asyncio.to_thread(profiler.publish)
+        except OSError as e:
+            await message.answer(f"⚠️ Настройки применены только в процессе {profiler.stats()['pid']}: {e}")
+            return
+    await message.answer(describe_profiler(profiler))
@@ -11,12 +11,15 @@ from app.services.weather import WeatherService
 from app.services.points_of_interest import PointsOfInterestService
 
 router = Router()
-weather_service = WeatherService()
-poi_service = PointsOfInterestService()
 
 
 @router.message(CitySelection.waiting_city_input)
-async def process_city_selection(message: types.Message, state: FSMContext):
+async def process_city_selection(
+    message: types.Message,
+    state: FSMContext,
+    weather_service: WeatherService,
+    poi_service: PointsOfInterestService,
+):
     data = await state.get_data()
     mode = data.get("city_mode")
 
@@ -2,31 +2,28 @@ from aiogram import Router, types
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 
-from app.database.session import get_db
 from app.repositories import TripRepository
 from app.utils.states import CitySelection
 from app.utils.formatters import format_poi_response
-from app.keyboards import build_city_choices_reply
+from app.keyboards import cached_city_choices_reply
 from app.services.points_of_interest import PointsOfInterestService
 
 router = Router()
-poi_service = PointsOfInterestService()
 
 
-async def _start_city_selection(message: types.Message, state: FSMContext, prompt: str):
-    db_gen = get_db()
-    db = next(db_gen)
-    try:
-        trips = TripRepository(db).list_for_user(message.from_user.id)
-        unique_cities = sorted({t.destination for t in trips})
-        await state.update_data(city_mode="poi")
-        await message.answer(prompt, reply_markup=build_city_choices_reply(unique_cities))
-        await state.set_state(CitySelection.waiting_city_input)
-    finally:
-        db.close()
+async def _start_city_selection(
+    message: types.Message,
+    state: FSMContext,
+    trip_repo: TripRepository,
+    prompt: str,
+):
+    cities = await trip_repo.list_destinations(message.from_user.id)
+    await state.update_data(city_mode="poi")
+    await message.answer(prompt, reply_markup=cached_city_choices_reply(cities))
+    await state.set_state(CitySelection.waiting_city_input)
 
 
-async def cmd_top_location_list(message: types.Message, state: FSMContext):
+async def cmd_top_location_list(message: types.Message, state: FSMContext, trip_repo: TripRepository):
     if not message.from_user:
         await message.answer("Ошибка: пользователь не найден")
         return
@@ -34,19 +31,25 @@ async def cmd_top_location_list(message: types.Message, state: FSMContext):
     await _start_city_selection(
         message,
         state,
+        trip_repo,
         prompt="Выберите город из ваших поездок или введите название:",
     )
 
 
 @router.message(Command("top_location"))
-async def cmd_top_location_with_city(message: types.Message, state: FSMContext):
+async def cmd_top_location_with_city(
+    message: types.Message,
+    state: FSMContext,
+    poi_service: PointsOfInterestService,
+    trip_repo: TripRepository,
+):
     if not message.text:
         await message.answer("Ошибка: пустое сообщение")
         return
 
     command_parts = message.text.split(maxsplit=1)
     if len(command_parts) < 2:
-        await cmd_top_location_list(message, state)
+        await cmd_top_location_list(message, state, trip_repo)
         return
 
     city_name = command_parts[1].strip()
@@ -1,24 +1,16 @@
 from aiogram import Router, types
 from aiogram.filters import Command
-from sqlalchemy.orm import Session
-from app.database.models import User
-from app.database.session import get_db
+from app.repositories import UserRepository
 
 router = Router()
 
 @router.message(Command("start"))
-async def cmd_start(message: types.Message):
-    db = next(get_db())
-
-    user = db.query(User).filter(User.user_id == message.from_user.id).first()
-    if not user:
-        new_user = User(
-            user_id=message.from_user.id,
-            username=message.from_user.username,
-            first_name=message.from_user.first_name
-        )
-        db.add(new_user)
-        db.commit()
+async def cmd_start(message: types.Message, user_repo: UserRepository):
+    await user_repo.ensure_user(
+        user_id=message.from_user.id,
+        username=message.from_user.username,
+        first_name=message.from_user.first_name
+    )
 
     welcome_text = """
     🎉 Добро пожаловать в Travel Planner! 🗺️
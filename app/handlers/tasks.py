@@ -1,21 +1,18 @@
 from aiogram import Router, types, F
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
-from sqlalchemy.orm import Session
 
-from app.database.models import Trip
-from app.database.session import get_db
 from app.utils.states import TaskCreation
 from app.repositories import TaskRepository, TripRepository
-from app.keyboards import build_trips_reply, build_tasks_inline
+from app.keyboards import build_trips_reply, build_trip_tasks_pages, set_task_status, remove_task_row
+from app.services.outbox import send_in_background
+from app.services.validators import parse_tasks
 
 router = Router()
 
 @router.message(Command("add_task"))
-async def cmd_add_task(message: types.Message, state: FSMContext):
-    db = next(get_db())
-    trip_repo = TripRepository(db)
-    trips = trip_repo.list_for_user(message.from_user.id)
+async def cmd_add_task(message: types.Message, state: FSMContext, trip_repo: TripRepository):
+    trips = await trip_repo.list_for_user(message.from_user.id)
 
     if not trips:
         await message.answer("У вас пока нет поездок. Создайте первую с помощью /new_trip")
@@ -31,7 +28,7 @@ async def process_trip_selection(message: types.Message, state: FSMContext):
         trip_id = int(message.text.split(":")[0])
         await state.update_data(trip_id=trip_id)
         await message.answer(
-            "Введите описание задачи:",
+            "Введите задачу или сразу несколько — каждую с новой строки:",
             reply_markup=types.ReplyKeyboardRemove()
         )
         await state.set_state(TaskCreation.description)
@@ -39,47 +36,73 @@ async def process_trip_selection(message: types.Message, state: FSMContext):
         await message.answer("Пожалуйста, выберите поездку из предложенного списка")
 
 @router.message(TaskCreation.description)
-async def process_task_description(message: types.Message, state: FSMContext):
-    data = await state.get_data()
+async def process_task_description(message: types.Message, state: FSMContext, task_repo: TaskRepository):
+    try:
+        tasks = parse_tasks(message.text or "")
+    except ValueError as e:
+        await message.answer(str(e))
+        return
 
-    db = next(get_db())
-    task_repo = TaskRepository(db)
-    task_repo.create(trip_id=data['trip_id'], description=message.text)
+    data = await state.get_data()
+    await task_repo.create_many(trip_id=data['trip_id'], tasks=tasks)
 
-    await message.answer(f"✅ Задача добавлена: {message.text}")
+    if len(tasks) == 1:
+        await message.answer(f"✅ Задача добавлена: {tasks[0][0]}")
+    else:
+        await message.answer(f"✅ Добавлено задач: {len(tasks)}. Посмотреть список: /tasks")
     await state.clear()
 
 @router.message(Command("tasks"))
-async def cmd_show_tasks(message: types.Message):
-    db = next(get_db())
-    trip_repo = TripRepository(db)
-    task_repo = TaskRepository(db)
-
-    trips = trip_repo.list_for_user(message.from_user.id)
+async def cmd_show_tasks(message: types.Message, trip_repo: TripRepository):
+    trips = await trip_repo.list_with_tasks(message.from_user.id)
     if not trips:
         await message.answer("У вас пока нет поездок.")
         return
 
-    for trip in trips:
-        tasks = task_repo.list_for_trip(trip.trip_id)
-        if not tasks:
-            continue
-        kb = build_tasks_inline([(t.task_id, t.description, t.is_completed) for t in tasks])
-        await message.answer(f"📍 {trip.destination}", reply_markup=kb)
+    pages = build_trip_tasks_pages([
+        (trip.trip_id, trip.destination, [(t.task_id, t.description, t.is_completed) for t in trip.tasks])
+        for trip in trips
+        if trip.tasks
+    ])
+    if not pages:
+        await message.answer("Задач пока нет. Добавьте первую с помощью /add_task")
+        return
+
+    if len(pages) == 1:
+        await message.answer("✅ Ваши задачи", reply_markup=pages[0])
+        return
+    await message.answer(f"✅ Ваши задачи (1/{len(pages)})", reply_markup=pages[0])
+    # the first page answers the command, the rest must not hold up other users' replies or this update
+    send_in_background([
+        message.answer(f"✅ Ваши задачи ({number}/{len(pages)})", reply_markup=kb)
+        for number, kb in enumerate(pages[1:], start=2)
+    ])
 
 
 @router.callback_query(F.data.startswith("task:"))
-async def process_task_action(callback: types.CallbackQuery):
+async def process_task_action(callback: types.CallbackQuery, task_repo: TaskRepository):
     action, entity, task_id_str = callback.data.split(":")
     task_id = int(task_id_str)
-    db = next(get_db())
-    task_repo = TaskRepository(db)
     if entity == "toggle":
-        ok = task_repo.toggle_complete(task_id)
-        await callback.answer("Готово" if ok else "Не найдено", show_alert=not ok)
+        is_completed = await task_repo.toggle_complete(task_id)
+        if is_completed is None:
+            await callback.answer("Не найдено", show_alert=True)
+            return
+        if callback.message and callback.message.reply_markup:
+            await callback.message.edit_reply_markup(
+                reply_markup=set_task_status(callback.message.reply_markup, task_id, is_completed)
+            )
+        await callback.answer("Готово")
     elif entity == "delete":
-        ok = task_repo.delete(task_id)
-        if ok and callback.message:
-            await callback.message.delete()
-        else:
-            await callback.answer("Не удалось удалить", show_alert=True)
\ No newline at end of file
+        ok = await task_repo.delete(task_id)
+        if not ok:
+            await callback.answer("Не удалось удалить", show_alert=True)
+            return
+        if callback.message and callback.message.reply_markup:
+            # one message holds many trips now, so only this task's row goes away
+            kb = remove_task_row(callback.message.reply_markup, task_id)
+            if kb:
+                await callback.message.edit_reply_markup(reply_markup=kb)
+            else:
+                await callback.message.delete()
+        await callback.answer("Удалено")
\ No newline at end of file
@@ -1,10 +1,8 @@
 from aiogram import Router, types, F
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
-from sqlalchemy.orm import Session
 from datetime import datetime
 
-from app.database.session import get_db
 from app.utils.states import TripCreation
 from app.services.validators import validate_date, validate_destination
 from app.repositories import TripRepository
@@ -35,7 +33,8 @@ async def process_destination(message: types.Message, state: FSMContext):
 async def process_start_date(message: types.Message, state: FSMContext):
     try:
         start_date = validate_date(message.text)
-        await state.update_data(start_date=start_date)
+        # FSM data must survive json round-trips when it lives in Redis
+        await state.update_data(start_date=start_date.isoformat())
         await message.answer("📅 Введите дату окончания поездки (в формате ДД.ММ.ГГГГ):")
         await state.set_state(TripCreation.end_date)
     except ValueError as e:
@@ -46,48 +45,46 @@ async def process_end_date(message: types.Message, state: FSMContext):
     try:
         end_date = validate_date(message.text)
         data = await state.get_data()
-        start_date = data['start_date']
+        start_date = datetime.fromisoformat(data['start_date'])
 
         if end_date < start_date:
             await message.answer("❌ Дата окончания должна быть позже или равна дате начала!")
             return
 
-        await state.update_data(end_date=end_date)
+        await state.update_data(end_date=end_date.isoformat())
         await message.answer("📝 Хотите добавить заметки к поездке? (Если нет, отправьте '-'):")
         await state.set_state(TripCreation.notes)
     except ValueError as e:
         await message.answer(str(e))
 
 @router.message(TripCreation.notes)
-async def process_notes(message: types.Message, state: FSMContext):
+async def process_notes(message: types.Message, state: FSMContext, trip_repo: TripRepository):
     data = await state.get_data()
     notes = message.text if message.text != '-' else None
+    start_date = datetime.fromisoformat(data['start_date'])
+    end_date = datetime.fromisoformat(data['end_date'])
 
-    db = next(get_db())
-    trip_repo = TripRepository(db)
-    trip = trip_repo.create(
+    await trip_repo.create(
         user_id=message.from_user.id,
         destination=data['destination'],
-        start_date=data['start_date'],
-        end_date=data['end_date'],
+        start_date=start_date,
+        end_date=end_date,
         notes=notes,
     )
 
     await message.answer(
         f"✅ Поездка создана!\n\n"
         f"📍 Направление: {data['destination']}\n"
-        f"📅 С: {data['start_date'].strftime('%d.%m.%Y')}\n"
-        f"📅 По: {data['end_date'].strftime('%d.%m.%Y')}\n"
+        f"📅 С: {start_date.strftime('%d.%m.%Y')}\n"
+        f"📅 По: {end_date.strftime('%d.%m.%Y')}\n"
         f"📝 Заметки: {notes if notes else 'нет'}"
     )
 
     await state.clear()
 
 @router.message(Command("my_trips"))
-async def cmd_my_trips(message: types.Message):
-    db = next(get_db())
-    trip_repo = TripRepository(db)
-    trips = trip_repo.list_for_user(message.from_user.id)
+async def cmd_my_trips(message: types.Message, trip_repo: TripRepository):
+    trips = await trip_repo.list_for_user(message.from_user.id)
 
     if not trips:
         await message.answer("У вас пока нет поездок. Создайте первую с помощью /new_trip")
@@ -98,14 +95,12 @@ async def cmd_my_trips(message: types.Message):
 
 
 @router.callback_query(F.data.startswith("trip:"))
-async def process_trip_action(callback: types.CallbackQuery):
+async def process_trip_action(callback: types.CallbackQuery, trip_repo: TripRepository):
     action, entity, trip_id_str = callback.data.split(":")
     trip_id = int(trip_id_str)
-    db = next(get_db())
-    trip_repo = TripRepository(db)
 
     if entity == "delete":
-        ok = trip_repo.delete(trip_id)
+        ok = await trip_repo.delete(trip_id)
         if ok:
             await callback.message.edit_text("🗑 Поездка удалена.")
         else:
@@ -1,9 +1,13 @@
-from .reply import build_trips_reply, build_city_choices_reply
-from .inline import build_trips_inline, build_tasks_inline
+from .reply import build_trips_reply, build_city_choices_reply, cached_city_choices_reply
+from .inline import build_trips_inline, build_tasks_inline, build_trip_tasks_pages, set_task_status, remove_task_row
 
 __all__ = [
     "build_trips_reply",
     "build_city_choices_reply",
+    "cached_city_choices_reply",
     "build_trips_inline",
     "build_tasks_inline",
+    "build_trip_tasks_pages",
+    "set_task_status",
+    "remove_task_row",
 ]
@@ -1,6 +1,10 @@
+from typing import Optional
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram import types
 
+# Telegram rejects inline keyboards with more than 100 buttons
+MAX_INLINE_BUTTONS = 100
+
 
 def build_trips_inline(trips: list[tuple[int, str]]) -> types.InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
@@ -24,3 +28,66 @@ def build_tasks_inline(tasks: list[tuple[int, str, bool]]) -> types.InlineKeyboa
             types.InlineKeyboardButton(text="🗑", callback_data=f"task:delete:{task_id}"),
         )
     return builder.as_markup()
+
+
+def build_trip_tasks_pages(
+    trips: list[tuple[int, str, list[tuple[int, str, bool]]]],
+    max_buttons: int = MAX_INLINE_BUTTONS,
+) -> list[types.InlineKeyboardMarkup]:
+    pages = []
+    rows = []
+    buttons = 0
+
+    def flush():
+        nonlocal rows, buttons
+        if rows:
+            pages.append(types.InlineKeyboardMarkup(inline_keyboard=rows))
+        rows, buttons = [], 0
+
+    for trip_id, destination, tasks in trips:
+        header = [types.InlineKeyboardButton(text=f"📍 {destination}", callback_data=f"trip:view:{trip_id}")]
+        # a trip header with no room for at least one task goes to the next page
+        if buttons + 3 > max_buttons:
+            flush()
+        rows.append(header)
+        buttons += 1
+        for task_id, description, is_completed in tasks:
+            if buttons + 2 > max_buttons:
+                flush()
+                rows.append(header)
+                buttons += 1
+            status = "✅" if is_completed else "⬜"
+            rows.append([
+                types.InlineKeyboardButton(text=f"{status} {description}", callback_data=f"task:toggle:{task_id}"),
+                types.InlineKeyboardButton(text="🗑", callback_data=f"task:delete:{task_id}"),
+            ])
+            buttons += 2
+    flush()
+    return pages
+
+
+def set_task_status(markup: types.InlineKeyboardMarkup, task_id: int, is_completed: bool) -> types.InlineKeyboardMarkup:
+    toggle_data = f"task:toggle:{task_id}"
+    status = "✅" if is_completed else "⬜"
+    rows = []
+    for row in markup.inline_keyboard:
+        if row[0].callback_data == toggle_data:
+            # the button text is "<status> <description>", only the status changes
+            description = row[0].text.split(" ", 1)[-1]
+            row = [row[0].model_copy(update={"text": f"{status} {description}"}), *row[1:]]
+        rows.append(row)
+    return types.InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+def remove_task_row(markup: types.InlineKeyboardMarkup, task_id: int) -> Optional[types.InlineKeyboardMarkup]:
+    delete_data = f"task:delete:{task_id}"
+    rows = [row for row in markup.inline_keyboard if not any(button.callback_data == delete_data for button in row)]
+    # drop trip headers that no longer have tasks under them
+    rows = [
+        row for index, row in enumerate(rows)
+        if not row[0].callback_data.startswith("trip:view:")
+        or (index + 1 < len(rows) and rows[index + 1][0].callback_data.startswith("task:"))
+    ]
+    if not rows:
+        return None
+    return types.InlineKeyboardMarkup(inline_keyboard=rows)
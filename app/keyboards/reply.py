@@ -1,3 +1,4 @@
+from functools import lru_cache
 from aiogram import types
 from aiogram.utils.keyboard import ReplyKeyboardBuilder
 
@@ -18,3 +19,9 @@ def build_city_choices_reply(cities: list[str], include_other: bool = True) -> t
         builder.add(types.KeyboardButton(text="Другой город..."))
     builder.adjust(2)
     return builder.as_markup(resize_keyboard=True, one_time_keyboard=True)
+
+
+@lru_cache(maxsize=1024)
+def cached_city_choices_reply(cities: tuple[str, ...]) -> types.ReplyKeyboardMarkup:
+    # users with the same destinations share one markup object
+    return build_city_choices_reply(list(cities))
@@ -0,0 +1,10 @@
+from .db import DbSessionMiddleware
+from .metrics import HandlerMetricsMiddleware, UpdateMetricsMiddleware
+from .profiling import ProfilingMiddleware
+
+__all__ = [
+    "DbSessionMiddleware",
+    "HandlerMetricsMiddleware",
+    "ProfilingMiddleware",
+    "UpdateMetricsMiddleware",
+]
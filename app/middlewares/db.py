@@ -0,0 +1,83 @@
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.config import settings
+from app.database.session import SessionLocal
+from app.repositories import UserRepository, TripRepository, TaskRepository
+
+logger = logging.getLogger(__name__)
+
+
+class SessionTracker:
+    def __init__(self, leak_timeout: float):
+        self.leak_timeout = leak_timeout
+        self.opened = 0
+        self.leaked = 0
+        self._open: Dict[int, tuple] = {}
+        self._reported = set()
+
+    def open(self, session, label: str) -> int:
+        key = id(session)
+        self.opened += 1
+        self._open[key] = (time.monotonic(), label)
+        self.check_leaks()
+        return key
+
+    def close(self, key: int):
+        self._open.pop(key, None)
+        self._reported.discard(key)
+
+    def check_leaks(self):
+        now = time.monotonic()
+        for key, (opened_at, label) in self._open.items():
+            held = now - opened_at
+            if held >= self.leak_timeout and key not in self._reported:
+                self._reported.add(key)
+                self.leaked += 1
+                logger.warning(f"Сессия БД для {label} удерживается уже {held:.1f} с")
+
+    def snapshot(self) -> dict:
+        return {"opened": self.opened, "open": len(self._open), "leaked": self.leaked}
+
+
+def describe_update(event: TelegramObject) -> str:
+    if isinstance(event, Update):
+        if event.message and event.message.text:
+            return f"message {event.message.text.split(maxsplit=1)[0][:32]}"
+        if event.callback_query and event.callback_query.data:
+            return f"callback {event.callback_query.data.split(':', 1)[0]}"
+        return f"update {event.event_type}"
+    return type(event).__name__
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    def __init__(self, session_factory: async_sessionmaker = SessionLocal):
+        self.session_factory = session_factory
+        self.tracker = SessionTracker(settings.DB_SESSION_LEAK_TIMEOUT)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        async with self.session_factory() as session:
+            key = self.tracker.open(session, describe_update(event))
+            data["db"] = session
+            data["user_repo"] = UserRepository(session)
+            data["trip_repo"] = TripRepository(session)
+            data["task_repo"] = TaskRepository(session)
+            try:
+                result = await handler(event, data)
+                await session.commit()
+                return result
+            except Exception:
+                await session.rollback()
+                raise
+            finally:
+                self.tracker.close(key)
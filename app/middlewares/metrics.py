@@ -0,0 +1,79 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from app.database.queries import QueryStats, current_queries
+from app.utils.metrics import registry
+
+UPDATE_DURATION = registry.histogram(
+    "update_duration_seconds",
+    "Full update processing time including middlewares and commit",
+    ["event", "status"],
+)
+HANDLER_DURATION = registry.histogram(
+    "handler_duration_seconds",
+    "Handler latency",
+    ["handler", "status"],
+)
+UPDATE_DB_QUERIES = registry.histogram(
+    "update_db_queries",
+    "SQL statements executed per update",
+    ["handler"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+UPDATE_DB_DURATION = registry.histogram(
+    "update_db_duration_seconds",
+    "Total SQL time per update",
+    ["handler"],
+)
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    # outer middleware: has to wrap DbSessionMiddleware so the commit is counted too
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        stats = QueryStats()
+        token = current_queries.set(stats)
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            return await handler(event, data)
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            current_queries.reset(token)
+            event_type = event.event_type if isinstance(event, Update) else type(event).__name__
+            UPDATE_DURATION.observe(time.perf_counter() - started, event=event_type, status=status)
+            UPDATE_DB_QUERIES.observe(stats.count, handler=stats.handler)
+            UPDATE_DB_DURATION.observe(stats.duration, handler=stats.handler)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    # inner middleware: only runs once a handler matched, data["handler"] names it
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        handler_object = data.get("handler")
+        name = handler_object.callback.__name__ if handler_object is not None else "unknown"
+        stats = current_queries.get()
+        if stats is not None:
+            stats.handler = name
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            return await handler(event, data)
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            HANDLER_DURATION.observe(time.perf_counter() - started, handler=name, status=status)
@@ -0,0 +1,35 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Message, TelegramObject
+
+from app.utils.profiling import Profiler
+
+
+def describe_command(event: TelegramObject, data: Dict[str, Any]) -> str:
+    handler_object = data.get("handler")
+    name = handler_object.callback.__name__ if handler_object is not None else "unknown"
+    if isinstance(event, Message) and event.text and event.text.startswith("/"):
+        return f"{event.text.split(maxsplit=1)[0][1:].split('@')[0]}-{name}"
+    if isinstance(event, CallbackQuery) and event.data:
+        return f"{event.data.split(':', 1)[0]}-{name}"
+    return name
+
+
+class ProfilingMiddleware(BaseMiddleware):
+    # inner middleware, the profile covers the matched handler only
+    def __init__(self, profiler: Profiler):
+        self.profiler = profiler
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not self.profiler.enabled:
+            return await handler(event, data)
+        user = data.get("event_from_user")
+        if not self.profiler.should_profile(user.id if user else None):
+            return await handler(event, data)
+        return await self.profiler.profile(describe_command(event, data), lambda: handler(event, data))
@@ -1,33 +1,48 @@
-from typing import List
-from sqlalchemy.orm import Session
+from typing import List, Optional, Sequence, Tuple
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database.models import Task
 
 
 class TaskRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def create(self, trip_id: int, description: str) -> Task:
+    async def create(self, trip_id: int, description: str) -> Task:
         task = Task(trip_id=trip_id, description=description)
         self.db.add(task)
-        self.db.commit()
+        await self.db.flush()
         return task
 
-    def list_for_trip(self, trip_id: int) -> List[Task]:
-        return self.db.query(Task).filter(Task.trip_id == trip_id).all()
+    async def create_many(self, trip_id: int, tasks: Sequence[Tuple[str, bool]]) -> List[int]:
+        result = await self.db.execute(
+            insert(Task).returning(Task.task_id),
+            [
+                {"trip_id": trip_id, "description": description, "is_completed": is_completed}
+                for description, is_completed in tasks
+            ],
+        )
+        return list(result.scalars())
 
-    def toggle_complete(self, task_id: int) -> bool:
-        task = self.db.query(Task).filter(Task.task_id == task_id).first()
-        if not task:
-            return False
-        task.is_completed = not task.is_completed
-        self.db.commit()
-        return True
+    async def list_for_trip(self, trip_id: int) -> List[Task]:
+        result = await self.db.execute(select(Task).where(Task.trip_id == trip_id))
+        return list(result.scalars().all())
 
-    def delete(self, task_id: int) -> bool:
-        task = self.db.query(Task).filter(Task.task_id == task_id).first()
-        if not task:
-            return False
-        self.db.delete(task)
-        self.db.commit()
-        return True
\ No newline at end of file
+    async def toggle_complete(self, task_id: int) -> Optional[bool]:
+        result = await self.db.execute(
+            update(Task)
+            .where(Task.task_id == task_id)
+            .values(is_completed=~func.coalesce(Task.is_completed, False))
+            .returning(Task.is_completed)
+            .execution_options(synchronize_session=False)
+        )
+        return result.scalar_one_or_none()
+
+    async def delete(self, task_id: int) -> bool:
+        result = await self.db.execute(
+            delete(Task)
+            .where(Task.task_id == task_id)
+            .returning(Task.task_id)
+            .execution_options(synchronize_session=False)
+        )
+        return result.scalar_one_or_none() is not None
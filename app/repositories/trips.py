@@ -1,13 +1,52 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import List, Optional, Set, Tuple
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from app.config import settings
 from app.database.models import Trip
+from app.services.cache import TTLCache
+from app.services.cities import canonical_city
+
+# user_id -> sorted destinations for the city keyboards, shared by all repository instances
+destination_cache = TTLCache(
+    ttl=settings.DESTINATION_CACHE_TTL,
+    max_entries=settings.DESTINATION_CACHE_MAX_ENTRIES,
+)
+# the cache and its invalidation are per process, with several update processes a trip can change
+# in another one (a shared keyboard clicked by someone else), so there the lists are always read from the DB
+DESTINATION_CACHE_ENABLED = settings.sending_processes() == 1
+# bumped on every invalidation, a list read that raced with a commit is not cached
+destination_generation = 0
+
+PENDING_DESTINATIONS_KEY = "pending_destination_user_ids"
+
+
+# drop cached lists only once the change is visible to other sessions
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_destinations(session: Session):
+    global destination_generation
+    user_ids = session.info.pop(PENDING_DESTINATIONS_KEY, ())
+    if user_ids:
+        destination_generation += 1
+    for user_id in user_ids:
+        destination_cache.pop(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_pending_destinations(session: Session):
+    session.info.pop(PENDING_DESTINATIONS_KEY, None)
 
 
 class TripRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def create(self, user_id: int, destination: str, start_date, end_date, notes: Optional[str]) -> Trip:
+    def _destinations_changed(self, user_id: int):
+        pending: Set[int] = self.db.sync_session.info.setdefault(PENDING_DESTINATIONS_KEY, set())
+        pending.add(user_id)
+
+    async def create(self, user_id: int, destination: str, start_date, end_date, notes: Optional[str]) -> Trip:
         trip = Trip(
             user_id=user_id,
             destination=destination,
@@ -16,19 +55,69 @@ class TripRepository:
             notes=notes,
         )
         self.db.add(trip)
-        self.db.commit()
+        await self.db.flush()
+        self._destinations_changed(user_id)
         return trip
 
-    def list_for_user(self, user_id: int) -> List[Trip]:
-        return self.db.query(Trip).filter(Trip.user_id == user_id).order_by(Trip.start_date.desc()).all()
+    async def list_for_user(self, user_id: int) -> List[Trip]:
+        result = await self.db.execute(
+            select(Trip).where(Trip.user_id == user_id).order_by(Trip.start_date.desc())
+        )
+        return list(result.scalars().all())
+
+    async def list_with_tasks(self, user_id: int) -> List[Trip]:
+        result = await self.db.execute(
+            select(Trip)
+            .where(Trip.user_id == user_id)
+            .order_by(Trip.start_date.desc())
+            .options(selectinload(Trip.tasks))
+        )
+        return list(result.scalars().all())
+
+    async def list_destinations(self, user_id: int) -> Tuple[str, ...]:
+        cached = destination_cache.get(user_id) if DESTINATION_CACHE_ENABLED else None
+        if cached is not None:
+            return cached
+        generation = destination_generation
+        result = await self.db.execute(
+            select(Trip.destination).where(Trip.user_id == user_id).distinct()
+        )
+        # spellings of one city collapse into a single button
+        destinations = {}
+        for destination in sorted(result.scalars()):
+            destinations.setdefault(canonical_city(destination), destination)
+        cached = tuple(sorted(destinations.values()))
+        if DESTINATION_CACHE_ENABLED and generation == destination_generation:
+            destination_cache.set(user_id, cached)
+        return cached
+
+    async def list_upcoming_destinations(
+        self,
+        starts_from: datetime,
+        starts_before: datetime,
+        after_trip_id: int = 0,
+        limit: int = 500,
+    ) -> List[Tuple[int, str]]:
+        result = await self.db.execute(
+            select(Trip.trip_id, Trip.destination)
+            .where(
+                Trip.start_date >= starts_from,
+                Trip.start_date < starts_before,
+                Trip.trip_id > after_trip_id,
+            )
+            .order_by(Trip.trip_id)
+            .limit(limit)
+        )
+        return [(row.trip_id, row.destination) for row in result]
 
-    def get(self, trip_id: int) -> Optional[Trip]:
-        return self.db.query(Trip).filter(Trip.trip_id == trip_id).first()
+    async def get(self, trip_id: int) -> Optional[Trip]:
+        return await self.db.get(Trip, trip_id)
 
-    def delete(self, trip_id: int) -> bool:
-        trip = self.get(trip_id)
+    async def delete(self, trip_id: int) -> bool:
+        trip = await self.get(trip_id)
         if not trip:
             return False
-        self.db.delete(trip)
-        self.db.commit()
+        await self.db.delete(trip)
+        await self.db.flush()
+        self._destinations_changed(trip.user_id)
         return True
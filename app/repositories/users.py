@@ -1,20 +1,75 @@
-from typing import Optional
+from collections import OrderedDict
+from typing import Optional, Set
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from app.config import settings
 from app.database.models import User
 
+PENDING_USERS_KEY = "pending_user_ids"
+
+
+class KnownUserIds:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._ids: "OrderedDict[int, None]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, user_id: int) -> bool:
+        if user_id in self._ids:
+            self._ids.move_to_end(user_id)
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def add(self, user_id: int):
+        self._ids[user_id] = None
+        self._ids.move_to_end(user_id)
+        while len(self._ids) > self.max_entries:
+            self._ids.popitem(last=False)
+
+    def discard(self, user_id: int):
+        self._ids.pop(user_id, None)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._ids), "hits": self.hits, "misses": self.misses}
+
+
+known_users = KnownUserIds(settings.KNOWN_USERS_MAX_ENTRIES)
+
+
+# ids are only trusted once the row is committed, a rolled back /start must not skip the next insert
+@event.listens_for(Session, "after_commit")
+def _remember_committed_users(session: Session):
+    for user_id in session.info.pop(PENDING_USERS_KEY, ()):
+        known_users.add(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_pending_users(session: Session):
+    session.info.pop(PENDING_USERS_KEY, None)
+
 
 class UserRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def get_by_id(self, user_id: int) -> Optional[User]:
-        return self.db.query(User).filter(User.user_id == user_id).first()
-
-    def ensure_user(self, user_id: int, username: Optional[str], first_name: Optional[str]) -> User:
-        user = self.get_by_id(user_id)
-        if user:
-            return user
-        user = User(user_id=user_id, username=username, first_name=first_name)
-        self.db.add(user)
-        self.db.commit()
-        return user
+    async def get_by_id(self, user_id: int) -> Optional[User]:
+        return await self.db.get(User, user_id)
+
+    async def ensure_user(self, user_id: int, username: Optional[str], first_name: Optional[str]) -> bool:
+        if user_id in known_users:
+            return False
+        insert = postgresql_insert if self.db.bind.dialect.name == "postgresql" else sqlite_insert
+        result = await self.db.execute(
+            insert(User)
+            .values(user_id=user_id, username=username, first_name=first_name)
+            .on_conflict_do_nothing(index_elements=[User.user_id])
+        )
+        pending: Set[int] = self.db.sync_session.info.setdefault(PENDING_USERS_KEY, set())
+        pending.add(user_id)
+        return result.rowcount == 1
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+import aiohttp
+
+from app.config import settings
+from app.services.http import HttpClient
+from app.services.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+EXPIRY_SAFETY_MARGIN = 5.0
+
+
+class AmadeusTokenManager:
+    def __init__(self, http: HttpClient, base_url: str, client_id: Optional[str], client_secret: Optional[str]):
+        self.http = http
+        self.base_url = base_url
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_margin = settings.AMADEUS_TOKEN_REFRESH_MARGIN
+        self._token: Optional[str] = None
+        self._issued_at = 0.0
+        self._expires_at = 0.0
+        self._inflight = SingleFlight()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.refreshes = 0
+
+    async def get_token(self) -> str:
+        if self._token and time.monotonic() < self._expires_at - EXPIRY_SAFETY_MARGIN:
+            return self._token
+        token = await self._inflight.do("token", self._fetch_token)
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+        return token
+
+    async def _fetch_token(self) -> str:
+        async with self.http.post(
+            "amadeus",
+            f"{self.base_url}/security/oauth2/token",
+            data={
+                "grant_type": "client_credentials",
+                "client_id": self.client_id,
+                "client_secret": self.client_secret
+            }
+        ) as response:
+            if response.status != 200:
+                raise Exception("Не удалось получить access token")
+            data = await response.json()
+
+        expires_in = float(data.get("expires_in", 1799))
+        self._token = data["access_token"]
+        self._issued_at = time.monotonic()
+        self._expires_at = self._issued_at + expires_in
+        self.refreshes += 1
+        return self._token
+
+    def _refresh_delay(self) -> float:
+        expires_in = self._expires_at - self._issued_at
+        refresh_at = self._expires_at - self.refresh_margin if expires_in > 2 * self.refresh_margin else self._issued_at + expires_in / 2
+        return max(0.0, refresh_at - time.monotonic())
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self._refresh_delay())
+            try:
+                await self._inflight.do("token", self._fetch_token)
+            except Exception as e:
+                remaining = self._expires_at - time.monotonic()
+                logger.warning(f"Не удалось заранее обновить токен Amadeus: {e}")
+                if remaining <= 0:
+                    return
+                await asyncio.sleep(min(30.0, remaining / 2))
+
+    def invalidate(self, token: str):
+        if self._token == token:
+            self._token = None
+            self._expires_at = 0.0
+
+    async def request(self, method: str, url: str, **kwargs) -> aiohttp.ClientResponse:
+        headers = kwargs.pop("headers", {})
+        for attempt in range(2):
+            token = await self.get_token()
+            response = await self.http.request(
+                "amadeus",
+                method,
+                url,
+                headers={**headers, "Authorization": f"Bearer {token}"},
+                **kwargs,
+            )
+            if response.status == 401 and attempt == 0:
+                response.release()
+                self.invalidate(token)
+                continue
+            return response
+
+    async def close(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            await asyncio.gather(self._refresh_task, return_exceptions=True)
+            self._refresh_task = None
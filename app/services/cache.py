@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_size(value: Any) -> int:
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item) for item in value)
+    return size
+
+
+class TTLCache:
+    def __init__(
+        self,
+        ttl: float,
+        hard_ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = estimate_size,
+    ):
+        self.ttl = ttl
+        self.hard_ttl = hard_ttl if hard_ttl is not None and hard_ttl > ttl else ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self.lookup(key, allow_stale=False)
+        return default if entry is None else entry[0]
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        # fresh value without touching hit/miss counters or LRU order
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return default
+        return entry[3]
+
+    def lookup(self, key: Hashable, allow_stale: bool = True) -> Optional[Tuple[Any, bool]]:
+        now = time.monotonic()
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        fresh_until, expires_at, _, value = entry
+        if expires_at <= now:
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        stale = fresh_until <= now
+        if stale and not allow_stale:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        if stale:
+            self.stale_hits += 1
+        else:
+            self.hits += 1
+        return value, stale
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        now = time.monotonic()
+        if key in self._data:
+            self._remove(key)
+        size = self._sizeof(value) if self.max_bytes is not None else 0
+        fresh_for = self.ttl if ttl is None else ttl
+        self._data[key] = (now + fresh_for, now + max(fresh_for, self.hard_ttl), size, value)
+        self._bytes += size
+        self._evict()
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        self._remove(key)
+        return entry[3]
+
+    def clear(self):
+        self._data.clear()
+        self._bytes = 0
+
+    def sweep(self) -> int:
+        now = time.monotonic()
+        expired = [key for key, (_, expires_at, _, _) in self._data.items() if expires_at <= now]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+        return len(expired)
+
+    def _remove(self, key: Hashable):
+        _, _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def _evict(self):
+        while self._data and (
+            (self.max_entries is not None and len(self._data) > self.max_entries)
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            key = next(iter(self._data))
+            self._remove(key)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class CacheSweeper:
+    def __init__(self, sweeps: List[Callable[[], int]], interval: float):
+        self.sweeps = sweeps
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.expired = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def run_once(self) -> int:
+        # expired entries still count against max_bytes until something removes them, idle caches included
+        expired = sum(sweep() for sweep in self.sweeps)
+        self.runs += 1
+        self.expired += expired
+        return expired
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Ошибка очистки кэшей: {e}")
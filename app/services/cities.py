@@ -0,0 +1,98 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+CYRILLIC_TO_LATIN = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "e", "ж": "zh",
+    "з": "z", "и": "i", "й": "y", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o",
+    "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts",
+    "ч": "ch", "ш": "sh", "щ": "shch", "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "yu",
+    "я": "ya", "і": "i", "ї": "yi", "є": "ye", "ґ": "g", "ў": "u",
+}
+
+# canonical id -> (name sent to providers, spellings that share its cache entries, already transliterated)
+CITY_ALIASES = {
+    "moskva": ("Moscow", ["moscow", "moskau", "moscou", "mosca", "msk"]),
+    "sankt peterburg": ("Saint Petersburg", ["saint petersburg", "st petersburg", "petersburg", "sankt petersburg", "spb", "piter", "leningrad"]),
+    "kazan": ("Kazan", ["kazan city"]),
+    "nizhniy novgorod": ("Nizhny Novgorod", ["nizhny novgorod", "nizhnii novgorod", "nizhniy", "nizhny"]),
+    "ekaterinburg": ("Yekaterinburg", ["yekaterinburg", "jekaterinburg", "ekb"]),
+    "novosibirsk": ("Novosibirsk", ["nsk"]),
+    "sochi": ("Sochi", []),
+    "kaliningrad": ("Kaliningrad", ["konigsberg", "koenigsberg"]),
+    "vladivostok": ("Vladivostok", []),
+    "kyiv": ("Kyiv", ["kiev", "kiyev", "kiiv", "kyev", "kiyiv"]),
+    "minsk": ("Minsk", []),
+    "tbilisi": ("Tbilisi", ["tiflis"]),
+    "erevan": ("Yerevan", ["yerevan"]),
+    "baku": ("Baku", []),
+    "almaty": ("Almaty", ["alma ata", "almaata"]),
+    "tashkent": ("Tashkent", ["toshkent"]),
+    "istanbul": ("Istanbul", ["stambul", "constantinople", "konstantinopol"]),
+    "antalya": ("Antalya", ["antaliya"]),
+    "paris": ("Paris", ["parizh"]),
+    "london": ("London", ["londres", "londra"]),
+    "rome": ("Rome", ["rim", "roma"]),
+    "milan": ("Milan", ["milano", "milan italy"]),
+    "venice": ("Venice", ["venetsiya", "venezia", "venedig"]),
+    "florence": ("Florence", ["florentsiya", "firenze"]),
+    "berlin": ("Berlin", []),
+    "munich": ("Munich", ["myunkhen", "munchen", "muenchen"]),
+    "vienna": ("Vienna", ["vena", "wien"]),
+    "prague": ("Prague", ["praga", "praha", "prag"]),
+    "warsaw": ("Warsaw", ["varshava", "warszawa"]),
+    "budapest": ("Budapest", ["budapesht"]),
+    "barcelona": ("Barcelona", ["barselona"]),
+    "madrid": ("Madrid", []),
+    "lisbon": ("Lisbon", ["lissabon", "lisboa"]),
+    "athens": ("Athens", ["afiny", "athina"]),
+    "amsterdam": ("Amsterdam", []),
+    "brussels": ("Brussels", ["bryussel", "bruxelles", "brussel"]),
+    "copenhagen": ("Copenhagen", ["kopengagen", "kobenhavn"]),
+    "stockholm": ("Stockholm", []),
+    "helsinki": ("Helsinki", ["khelsinki"]),
+    "riga": ("Riga", []),
+    "tallinn": ("Tallinn", ["tallin"]),
+    "vilnius": ("Vilnius", ["vilnyus"]),
+    "new york": ("New York", ["nyu york", "nyu iork", "nyc", "new york city"]),
+    "dubai": ("Dubai", ["dubay"]),
+    "beijing": ("Beijing", ["pekin", "peking"]),
+    "tokyo": ("Tokyo", ["tokio"]),
+    "seoul": ("Seoul", ["seul"]),
+    "bangkok": ("Bangkok", ["bangkog"]),
+    "cairo": ("Cairo", ["kair"]),
+}
+
+ALIAS_INDEX = {
+    alias: canonical
+    for canonical, (_, aliases) in CITY_ALIASES.items()
+    for alias in [canonical, *aliases]
+}
+
+_SEPARATORS = re.compile(r"[\s\-_.,'’`\"()]+")
+
+
+def fold_whitespace(name: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", name).split())
+
+
+def canonicalize(name: str) -> str:
+    text = unicodedata.normalize("NFKC", name).casefold()
+    text = "".join(CYRILLIC_TO_LATIN.get(char, char) for char in text)
+    text = "".join(
+        char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char)
+    )
+    text = _SEPARATORS.sub(" ", text).strip()
+    return ALIAS_INDEX.get(text, text)
+
+
+@lru_cache(maxsize=8192)
+def canonical_city(name: str) -> str:
+    return canonicalize(name)
+
+
+def city_query(name: str) -> str:
+    # derived from the cache key only, so every spelling that shares an entry fetches the same city
+    canonical = canonical_city(name)
+    alias_group = CITY_ALIASES.get(canonical)
+    return alias_group[0] if alias_group else canonical
@@ -0,0 +1,174 @@
+import asyncio
+import csv
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, Iterator, Optional, Tuple
+
+from app.config import settings
+from app.services.cities import canonical_city, canonicalize
+
+logger = logging.getLogger(__name__)
+
+Coordinates = Tuple[float, float]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocodes (
+    name_key TEXT PRIMARY KEY,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    source TEXT NOT NULL,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS geocode_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+# GeoNames cities dump columns: geonameid, name, asciiname, alternatenames, latitude, longitude, ...
+GEONAMES_NAME = 1
+GEONAMES_ASCII_NAME = 2
+GEONAMES_ALTERNATE_NAMES = 3
+GEONAMES_LAT = 4
+GEONAMES_LON = 5
+GEONAMES_POPULATION = 14
+SEED_BATCH_SIZE = 10000
+
+
+def geocode_key(name: str) -> str:
+    return canonical_city(name)
+
+
+def _connect(path: str, timeout: float = settings.GEOCODE_DB_TIMEOUT) -> sqlite3.Connection:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # the file is shared by every process; a short busy timeout turns a held lock into a miss instead of a stall
+    connection = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+class GeocodeStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._connection = _connect(path)
+        # one thread owns the connection, sqlite calls never run on the event loop
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="geocode")
+        self._memory: Dict[str, Coordinates] = {}
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    async def _run(self, call, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call, *args)
+
+    def _select(self, key: str) -> Optional[Tuple[float, float]]:
+        return self._connection.execute(
+            "SELECT lat, lon FROM geocodes WHERE name_key = ?", (key,)
+        ).fetchone()
+
+    def _insert(self, key: str, lat: float, lon: float, source: str):
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO geocodes (name_key, lat, lon, source, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (key, lat, lon, source, time.time()),
+            )
+
+    async def lookup(self, name: str) -> Optional[Coordinates]:
+        key = geocode_key(name)
+        coordinates = self._memory.get(key)
+        if coordinates is None:
+            try:
+                row = await self._run(self._select, key)
+            except sqlite3.OperationalError as e:
+                self.errors += 1
+                logger.warning(f"Геокэш недоступен для {key}: {e}")
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            coordinates = self._memory[key] = (row[0], row[1])
+        self.hits += 1
+        return coordinates
+
+    async def put(self, name: str, lat: float, lon: float, source: str):
+        key = geocode_key(name)
+        self._memory[key] = (lat, lon)
+        try:
+            await self._run(self._insert, key, lat, lon, source)
+        except sqlite3.OperationalError as e:
+            self.errors += 1
+            logger.warning(f"Не удалось сохранить координаты {key}: {e}")
+
+    def is_seeded(self) -> bool:
+        # blocking, called from worker threads at startup
+        row = self._connection.execute(
+            "SELECT value FROM geocode_meta WHERE key = 'geonames_seeded'"
+        ).fetchone()
+        return row is not None
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "errors": self.errors, "memory": len(self._memory)}
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self._connection.close()
+
+
+def _geonames_records(dump_path: str) -> Iterator[tuple]:
+    with open(dump_path, encoding="utf-8") as dump:
+        for row in csv.reader(dump, delimiter="\t", quoting=csv.QUOTE_NONE):
+            if len(row) <= GEONAMES_POPULATION:
+                continue
+            try:
+                lat, lon = float(row[GEONAMES_LAT]), float(row[GEONAMES_LON])
+            except ValueError:
+                continue
+            population = int(row[GEONAMES_POPULATION] or 0)
+            names = {row[GEONAMES_NAME], row[GEONAMES_ASCII_NAME]}
+            names.update(filter(None, row[GEONAMES_ALTERNATE_NAMES].split(",")))
+            # bypasses the lru cache so a full dump does not flush the hot city keys
+            for key in {canonicalize(name) for name in names}:
+                if key:
+                    yield key, lat, lon, population
+
+
+def seed_from_geonames(path: str, dump_path: str) -> int:
+    # Runs in a worker thread at startup, so it opens its own connection.
+    # The dump is streamed into a temp table in batches instead of being loaded into memory.
+    connection = _connect(path, timeout=30)
+    seeded = 0
+    try:
+        connection.execute(
+            "CREATE TEMP TABLE geonames_seed (name_key TEXT NOT NULL, lat REAL NOT NULL, lon REAL NOT NULL, population INTEGER NOT NULL)"
+        )
+        records = _geonames_records(dump_path)
+        while True:
+            batch = list(islice(records, SEED_BATCH_SIZE))
+            if not batch:
+                break
+            with connection:
+                connection.executemany("INSERT INTO geonames_seed VALUES (?, ?, ?, ?)", batch)
+            seeded += len(batch)
+        with connection:
+            # most populous city wins for ambiguous names, and resolved lookups are never overwritten
+            connection.execute(
+                "INSERT OR IGNORE INTO geocodes (name_key, lat, lon, source, updated_at) "
+                "SELECT name_key, lat, lon, 'geonames', ? FROM geonames_seed ORDER BY population DESC",
+                (time.time(),),
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO geocode_meta (key, value) VALUES ('geonames_seeded', ?)",
+                (os.path.basename(dump_path),),
+            )
+    finally:
+        connection.close()
+    logger.info(f"Загружено {seeded} названий городов из {dump_path}")
+    return seeded
@@ -0,0 +1,126 @@
+import logging
+import time
+from collections import deque
+from typing import Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+LATENCY_BUCKET = 0.5
+
+
+class ProviderHealth:
+    def __init__(self, name: str, window: int, max_age: float, failure_threshold: int, open_seconds: float):
+        self.name = name
+        self.max_age = max_age
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self._samples = deque(maxlen=window)
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def _refresh_state(self):
+        if self.state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self.state = HALF_OPEN
+            self._probe_in_flight = False
+            logger.info(f"Провайдер {self.name}: пробный запрос после паузы")
+
+    def available(self) -> bool:
+        self._refresh_state()
+        if self.state == OPEN:
+            return False
+        return not (self.state == HALF_OPEN and self._probe_in_flight)
+
+    def try_acquire(self) -> bool:
+        if not self.available():
+            return False
+        if self.state == HALF_OPEN:
+            self._probe_in_flight = True
+        return True
+
+    def release(self):
+        self._probe_in_flight = False
+
+    def record(self, ok: bool, latency: float):
+        self._samples.append((time.monotonic(), ok, latency))
+        self._probe_in_flight = False
+        if ok:
+            self.consecutive_failures = 0
+            if self.state != CLOSED:
+                logger.info(f"Провайдер {self.name} снова доступен")
+            self.state = CLOSED
+            return
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                logger.warning(
+                    f"Провайдер {self.name} отключён на {self.open_seconds} с "
+                    f"после {self.consecutive_failures} ошибок подряд"
+                )
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+
+    def _recent(self) -> deque:
+        cutoff = time.monotonic() - self.max_age
+        while self._samples and self._samples[0][0] < cutoff:
+            self._samples.popleft()
+        return self._samples
+
+    @property
+    def success_rate(self) -> float:
+        samples = self._recent()
+        if not samples:
+            return 1.0
+        return sum(1 for _, ok, _ in samples if ok) / len(samples)
+
+    @property
+    def avg_latency(self) -> float:
+        latencies = [latency for _, ok, latency in self._recent() if ok]
+        if not latencies:
+            return float("inf")
+        return sum(latencies) / len(latencies)
+
+    def rank(self) -> tuple:
+        # untried providers (or ones whose samples aged out) rank as fast, so they get re-probed
+        latency = self.avg_latency if self._recent() else 0.0
+        if latency == float("inf"):
+            return (-round(self.success_rate, 1), latency)
+        return (-round(self.success_rate, 1), int(latency / LATENCY_BUCKET))
+
+    def snapshot(self) -> dict:
+        self._refresh_state()
+        return {
+            "state": self.state,
+            "samples": len(self._recent()),
+            "success_rate": round(self.success_rate, 3),
+            "avg_latency": None if self.avg_latency == float("inf") else round(self.avg_latency, 3),
+            "consecutive_failures": self.consecutive_failures,
+        }
+
+
+class ProviderHealthRegistry:
+    def __init__(
+        self,
+        names: Iterable[str],
+        window: int,
+        max_age: float,
+        failure_threshold: int,
+        open_seconds: float,
+    ):
+        self._providers: Dict[str, ProviderHealth] = {
+            name: ProviderHealth(name, window, max_age, failure_threshold, open_seconds) for name in names
+        }
+
+    def __getitem__(self, name: str) -> ProviderHealth:
+        return self._providers[name]
+
+    def order(self, names: Iterable[str]) -> List[str]:
+        # sorted() is stable, so providers with equal rank keep their configured order
+        return sorted(names, key=lambda name: self._providers[name].rank())
+
+    def snapshot(self) -> dict:
+        return {name: health.snapshot() for name, health in self._providers.items()}
@@ -0,0 +1,117 @@
+import logging
+import time
+from collections import defaultdict
+from typing import Dict, Optional
+
+import aiohttp
+
+from app.config import settings
+from app.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+UPSTREAM_DURATION = registry.histogram(
+    "upstream_request_duration_seconds",
+    "Upstream HTTP request latency by provider and response status",
+    ["provider", "status"],
+)
+
+
+class HttpClient:
+    def __init__(self, timeouts: Optional[Dict[str, float]] = None):
+        provider_timeouts = timeouts if timeouts is not None else {
+            "openweather": settings.OPENWEATHER_TIMEOUT,
+            "foursquare": settings.FOURSQUARE_TIMEOUT,
+            "opentripmap": settings.OPENTRIPMAP_TIMEOUT,
+            "amadeus": settings.AMADEUS_TIMEOUT,
+        }
+        self._timeouts = {
+            provider: aiohttp.ClientTimeout(total=seconds)
+            for provider, seconds in provider_timeouts.items()
+        }
+        self._default_timeout = aiohttp.ClientTimeout(total=settings.HTTP_DEFAULT_TIMEOUT)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._stats = defaultdict(int)
+        self._provider_stats = defaultdict(lambda: defaultdict(int))
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = self._create_session()
+        return self._session
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=settings.HTTP_POOL_LIMIT,
+            limit_per_host=settings.HTTP_POOL_LIMIT_PER_HOST,
+            ttl_dns_cache=settings.HTTP_DNS_CACHE_TTL,
+            keepalive_timeout=settings.HTTP_KEEPALIVE_TIMEOUT,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=self._default_timeout,
+            trace_configs=[self._build_trace_config()],
+        )
+
+    def _build_trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        def counter(name: str):
+            async def on_event(session, ctx, params):
+                self._stats[name] += 1
+                provider = (ctx.trace_request_ctx or {}).get("provider")
+                if provider:
+                    self._provider_stats[provider][name] += 1
+            return on_event
+
+        async def on_request_start(session, ctx, params):
+            ctx.started = time.perf_counter()
+
+        def observe(status):
+            async def on_event(session, ctx, params):
+                provider = (ctx.trace_request_ctx or {}).get("provider", "other")
+                code = status or str(params.response.status)
+                UPSTREAM_DURATION.observe(time.perf_counter() - ctx.started, provider=provider, status=code)
+            return on_event
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(observe(None))
+        trace_config.on_request_exception.append(observe("error"))
+        trace_config.on_request_start.append(counter("requests"))
+        trace_config.on_request_exception.append(counter("errors"))
+        trace_config.on_connection_create_end.append(counter("connections_created"))
+        trace_config.on_connection_reuseconn.append(counter("connections_reused"))
+        trace_config.on_dns_cache_hit.append(counter("dns_cache_hits"))
+        trace_config.on_dns_cache_miss.append(counter("dns_cache_misses"))
+        return trace_config
+
+    def request(self, provider: str, method: str, url: str, **kwargs):
+        kwargs.setdefault("timeout", self._timeouts.get(provider, self._default_timeout))
+        return self.session.request(
+            method,
+            url,
+            trace_request_ctx={"provider": provider},
+            **kwargs,
+        )
+
+    def get(self, provider: str, url: str, **kwargs):
+        return self.request(provider, "GET", url, **kwargs)
+
+    def post(self, provider: str, url: str, **kwargs):
+        return self.request(provider, "POST", url, **kwargs)
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "limit": settings.HTTP_POOL_LIMIT,
+            "limit_per_host": settings.HTTP_POOL_LIMIT_PER_HOST,
+            "open": self._session is not None and not self._session.closed,
+            "providers": {provider: dict(counters) for provider, counters in self._provider_stats.items()},
+        }
+
+    async def close(self):
+        if self._session is None or self._session.closed:
+            return
+        logger.info(f"HTTP pool stats: {self.stats()}")
+        await self._session.close()
+        self._session = None
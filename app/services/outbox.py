@@ -0,0 +1,292 @@
+import asyncio
+import contextvars
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Set
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import (
+    CopyMessage,
+    EditMessageReplyMarkup,
+    EditMessageText,
+    ForwardMessage,
+    SendDocument,
+    SendLocation,
+    SendMediaGroup,
+    SendMessage,
+    SendPhoto,
+    TelegramMethod,
+)
+
+from app.config import settings
+from app.utils.ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+# methods that count against Telegram's per-chat and global flood limits
+PACED_METHODS = (
+    SendMessage,
+    SendPhoto,
+    SendDocument,
+    SendLocation,
+    SendMediaGroup,
+    CopyMessage,
+    ForwardMessage,
+    EditMessageText,
+    EditMessageReplyMarkup,
+)
+
+send_priority: contextvars.ContextVar[int] = contextvars.ContextVar("send_priority", default=INTERACTIVE)
+_background_tasks: Set[asyncio.Task] = set()
+
+
+@contextmanager
+def background_sends():
+    token = send_priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        send_priority.reset(token)
+
+
+def send_in_background(methods: List[TelegramMethod]) -> asyncio.Task:
+    # the caller returns right away, so its update (and DB transaction) does not wait for pacing
+    async def send():
+        with background_sends():
+            for method in methods:
+                try:
+                    await method
+                except Exception as e:
+                    logger.warning(f"Не удалось отправить фоновое сообщение: {e}")
+                    return
+
+    task = asyncio.create_task(send())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+class _Outgoing(NamedTuple):
+    method: TelegramMethod
+    priority: int
+    future: asyncio.Future
+    make_request: NextRequestMiddlewareType
+    bot: Bot
+    enqueued_at: float
+
+
+class PriorityGate:
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self._waiters: Dict[int, Deque[asyncio.Future]] = {INTERACTIVE: deque(), BACKGROUND: deque()}
+        self._pump: Optional[asyncio.Task] = None
+
+    def waiting(self, priority: int) -> int:
+        return len(self._waiters[priority])
+
+    async def acquire(self, priority: int):
+        if not any(self._waiters.values()) and self.bucket.try_acquire():
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[priority].append(future)
+        if self._pump is None or self._pump.done():
+            self._pump = asyncio.create_task(self._run())
+        await future
+
+    def _next_waiter(self) -> Optional[asyncio.Future]:
+        for priority in (INTERACTIVE, BACKGROUND):
+            waiters = self._waiters[priority]
+            while waiters:
+                future = waiters.popleft()
+                if not future.done():
+                    return future
+        return None
+
+    async def _run(self):
+        while any(self._waiters.values()):
+            await asyncio.sleep(self.bucket.delay())
+            if not self.bucket.try_acquire():
+                continue
+            future = self._next_waiter()
+            if future is not None:
+                future.set_result(None)
+
+    def close(self):
+        if self._pump is not None:
+            self._pump.cancel()
+
+
+class SendScheduler(BaseRequestMiddleware):
+    def __init__(
+        self,
+        global_rate: float = settings.SEND_GLOBAL_RATE,
+        chat_rate: float = settings.SEND_CHAT_RATE,
+        chat_burst: float = settings.SEND_CHAT_BURST,
+        group_rate: float = settings.SEND_GROUP_RATE,
+        merge_max_chars: int = settings.SEND_MERGE_MAX_CHARS,
+        max_retries: int = settings.SEND_MAX_RETRIES,
+        max_chats: int = 10000,
+    ):
+        self.gate = PriorityGate(TokenBucket(global_rate, global_rate))
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.merge_max_chars = merge_max_chars
+        self.max_retries = max_retries
+        self.max_chats = max_chats
+        self._buckets: "OrderedDict[int, TokenBucket]" = OrderedDict()
+        self._queues: Dict[int, Deque[_Outgoing]] = {}
+        self._drains: Dict[int, asyncio.Task] = {}
+        self._latencies: Deque[float] = deque(maxlen=1000)
+        self.sent = 0
+        self.merged = 0
+        self.retries = 0
+        self.failed = 0
+
+    async def __call__(self, make_request: NextRequestMiddlewareType, bot: Bot, method: TelegramMethod):
+        chat_id = getattr(method, "chat_id", None)
+        if not isinstance(method, PACED_METHODS) or not isinstance(chat_id, int):
+            return await make_request(bot, method)
+
+        item = _Outgoing(
+            method,
+            send_priority.get(),
+            asyncio.get_running_loop().create_future(),
+            make_request,
+            bot,
+            time.monotonic(),
+        )
+        self._queues.setdefault(chat_id, deque()).append(item)
+        if chat_id not in self._drains:
+            self._drains[chat_id] = asyncio.create_task(self._drain(chat_id))
+        return await item.future
+
+    def _bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            # negative ids are groups and channels, which Telegram limits to about 20 messages a minute
+            rate = self.group_rate if chat_id < 0 else self.chat_rate
+            bucket = self._buckets[chat_id] = TokenBucket(rate, self.chat_burst if chat_id > 0 else 1)
+            while len(self._buckets) > self.max_chats:
+                self._buckets.popitem(last=False)
+        self._buckets.move_to_end(chat_id)
+        return bucket
+
+    def _mergeable(self, first: TelegramMethod, second: TelegramMethod, length: int) -> bool:
+        if not isinstance(first, SendMessage) or not isinstance(second, SendMessage):
+            return False
+        if first.reply_markup is not None or first.entities or second.entities:
+            return False
+        if length + len(second.text) + 2 > self.merge_max_chars:
+            return False
+        return all(
+            getattr(first, field) == getattr(second, field)
+            for field in SendMessage.model_fields
+            if field not in ("text", "reply_markup")
+        )
+
+    def _take_batch(self, queue: Deque[_Outgoing]) -> List[_Outgoing]:
+        batch: List[_Outgoing] = []
+        length = 0
+        while queue:
+            item = queue[0]
+            if item.future.done():
+                queue.popleft()
+                continue
+            # every caller of a merged batch gets the same Message, so only sends nobody reads back are merged
+            if batch and (item.priority != BACKGROUND or not self._mergeable(batch[-1].method, item.method, length)):
+                break
+            batch.append(queue.popleft())
+            length += len(item.method.text) + 2 if isinstance(item.method, SendMessage) else 0
+            if not isinstance(item.method, SendMessage) or item.priority != BACKGROUND:
+                break
+        return batch
+
+    async def _drain(self, chat_id: int):
+        queue = self._queues[chat_id]
+        batch: List[_Outgoing] = []
+        try:
+            while queue:
+                batch = self._take_batch(queue)
+                if not batch:
+                    continue
+                await self._bucket(chat_id).acquire()
+                await self.gate.acquire(min(item.priority for item in batch))
+                await self._send(batch)
+        finally:
+            # only reached with work left on shutdown; callers must not wait forever
+            for item in [*batch, *queue]:
+                if not item.future.done():
+                    item.future.cancel()
+            self._queues.pop(chat_id, None)
+            self._drains.pop(chat_id, None)
+
+    async def _send(self, batch: List[_Outgoing]):
+        head = batch[-1]
+        method = head.method
+        if len(batch) > 1:
+            method = head.method.model_copy(
+                update={"text": "\n\n".join(item.method.text for item in batch)}
+            )
+            self.merged += len(batch) - 1
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await head.make_request(head.bot, method)
+                break
+            except TelegramRetryAfter as e:
+                self.retries += 1
+                if attempt == self.max_retries:
+                    self._fail(batch, e)
+                    return
+                logger.warning(f"Flood limit для чата {method.chat_id}, повтор через {e.retry_after} с")
+                # the chat stays blocked while we wait, later messages keep their order
+                await asyncio.sleep(e.retry_after)
+            except Exception as e:
+                self._fail(batch, e)
+                return
+
+        now = time.monotonic()
+        self.sent += 1
+        for item in batch:
+            self._latencies.append(now - item.enqueued_at)
+            if not item.future.done():
+                item.future.set_result(response)
+
+    def _fail(self, batch: List[_Outgoing], error: Exception):
+        self.failed += 1
+        for item in batch:
+            if not item.future.done():
+                item.future.set_exception(error)
+
+    def depth(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+        return {
+            "queued": self.depth(),
+            "chats": len(self._drains),
+            "waiting_interactive": self.gate.waiting(INTERACTIVE),
+            "waiting_background": self.gate.waiting(BACKGROUND),
+            "sent": self.sent,
+            "merged": self.merged,
+            "retries": self.retries,
+            "failed": self.failed,
+            "latency_p50": round(latencies[len(latencies) // 2], 3) if latencies else 0.0,
+            "latency_p95": round(latencies[int(len(latencies) * 0.95)], 3) if latencies else 0.0,
+            "latency_max": round(latencies[-1], 3) if latencies else 0.0,
+        }
+
+    async def close(self):
+        self.gate.close()
+        for task in list(self._drains.values()):
+            task.cancel()
+        await asyncio.gather(*self._drains.values(), return_exceptions=True)
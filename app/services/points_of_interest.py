@@ -4,22 +4,77 @@ import os
 import json
 import asyncio
 import logging
+from typing import Optional, Tuple
 from openai import OpenAI
 from app.config import settings
+from app.services.auth import AmadeusTokenManager
+from app.services.cache import TTLCache
+from app.services.cities import canonical_city, city_query
+from app.services.geocode import GeocodeStore
+from app.services.health import ProviderHealthRegistry
+from app.services.http import HttpClient
+from app.services.refresh import BackgroundRefresher
+from app.services.singleflight import SingleFlight
+from app.utils.metrics import registry
 
 logger = logging.getLogger(__name__)
 
+PROVIDER_DURATION = registry.histogram(
+    "poi_provider_duration_seconds",
+    "POI provider call latency including SDK-based providers like DeepSeek",
+    ["provider", "outcome"],
+)
+
+PROVIDER_LABELS = {
+    "foursquare": "Foursquare API",
+    "opentripmap": "OpenTripMap API",
+    "deepseek": "DeepSeek",
+}
+
+class ProviderError(Exception):
+    pass
+
+
+def _near_not_geocoded(error_text: str) -> bool:
+    # an unknown city comes back as 400 {"message": "Failed to geocode near: ..."},
+    # any other 400 is a malformed request or bad configuration and counts as a failure
+    text = error_text.lower()
+    return "geocode" in text and "near" in text
+
+
 class PointsOfInterestService:
-    def __init__(self):
+    def __init__(self, http: HttpClient, refresher: BackgroundRefresher, geocoder: GeocodeStore):
+        self.http = http
+        self.refresher = refresher
+        self.geocoder = geocoder
         self.amadeus_api_key = settings.AMADEUS_API_KEY
         self.amadeus_api_secret = settings.AMADEUS_API_SECRET
         self.foursquare_api_key = settings.FOURSQUARE_API_KEY
         self.opentripmap_api_key = settings.OPENTRIPMAP_API_KEY
         self.deepseek_api_key = getattr(settings, "DEEPSEEK_API_KEY", None)
-        self.base_url = "https://test.api.amadeus.com/v1"
-        self.access_token = None
-        self._cache = {}
-        self._ttl_seconds = 1800
+        self.base_url = settings.AMADEUS_BASE_URL
+        self.tokens = AmadeusTokenManager(http, self.base_url, self.amadeus_api_key, self.amadeus_api_secret)
+        self._cache = TTLCache(
+            ttl=settings.POI_CACHE_TTL,
+            hard_ttl=settings.POI_CACHE_HARD_TTL,
+            max_entries=settings.POI_CACHE_MAX_ENTRIES,
+            max_bytes=settings.POI_CACHE_MAX_BYTES,
+        )
+        self._inflight = SingleFlight()
+        self.strategy = settings.POI_STRATEGY
+        self.hedge_delay = settings.POI_HEDGE_DELAY
+        self._provider_timeouts = {
+            "foursquare": settings.FOURSQUARE_TIMEOUT,
+            "opentripmap": settings.OPENTRIPMAP_TIMEOUT,
+            "deepseek": settings.DEEPSEEK_TIMEOUT,
+        }
+        self.health = ProviderHealthRegistry(
+            PROVIDER_LABELS,
+            window=settings.POI_HEALTH_WINDOW,
+            max_age=settings.POI_HEALTH_MAX_AGE,
+            failure_threshold=settings.POI_BREAKER_FAILURE_THRESHOLD,
+            open_seconds=settings.POI_BREAKER_OPEN_SECONDS,
+        )
 
         self._deepseek_client = None
         if self.deepseek_api_key:
@@ -32,61 +87,143 @@ class PointsOfInterestService:
                 logger.warning(f"Не удалось инициализировать DeepSeek клиента: {e}")
 
     async def _get_access_token(self) -> str:
-        if self.access_token:
-            return self.access_token
-
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                f"{self.base_url}/security/oauth2/token",
-                data={
-                    "grant_type": "client_credentials",
-                    "client_id": self.amadeus_api_key,
-                    "client_secret": self.amadeus_api_secret
-                }
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    self.access_token = data["access_token"]
-                    return self.access_token
-                else:
-                    raise Exception("Не удалось получить access token")
+        return await self.tokens.get_token()
 
     async def get_points_of_interest(self, city: str, limit: int = 5) -> list:
-        try:
-            key = (city.lower(), limit)
-            cached = self._cache.get(key)
-            now = time.time()
-            if cached and now - cached[0] < self._ttl_seconds:
-                return cached[1]
-
-            poi_data = await self._get_poi_from_foursquare(city, limit)
-            if poi_data:
-                logger.info(f"Получены данные из Foursquare API для {city}")
-                self._cache[key] = (now, poi_data)
-                return poi_data
-
-            poi_data = await self._get_poi_from_opentripmap(city, limit)
-            if poi_data:
-                logger.info(f"Получены данные из OpenTripMap API для {city}")
-                self._cache[key] = (now, poi_data)
-                return poi_data
+        key = (canonical_city(city), limit)
+        fetch = lambda: self._fetch_points_of_interest(city, limit, key)
+        entry = self._cache.lookup(key)
+        if entry is not None:
+            cached, stale = entry
+            if stale:
+                self.refresher.schedule(key, lambda: self._inflight.do(key, fetch))
+            return cached
+        return await self._inflight.do(key, fetch)
 
-            poi_data = await self._get_poi_from_deepseek(city, limit)
+    async def _fetch_points_of_interest(self, city: str, limit: int, key: tuple) -> list:
+        query = city_query(city)
+        try:
+            if self.strategy == "hedged":
+                provider, poi_data = await self._fetch_hedged(query, limit)
+            else:
+                provider, poi_data = await self._fetch_sequential(query, limit)
             if poi_data:
-                logger.info(f"Получены данные из DeepSeek для {city}")
-                self._cache[key] = (now, poi_data)
+                logger.info(f"Получены данные из {PROVIDER_LABELS[provider]} для {city}")
+                self._cache.set(key, poi_data)
                 return poi_data
 
-            logger.warning(f"Используем mock данные для {city}")
             data = self._get_mock_poi(city, limit)
-            self._cache[key] = (now, data)
+            if poi_data is None:
+                # providers failed or are switched off: keep the fallback out of the cache
+                logger.warning(f"Провайдеры недоступны, используем mock данные для {city}")
+                return data
+            logger.warning(f"Провайдеры ничего не нашли, используем mock данные для {city}")
+            self._cache.set(key, data)
             return data
 
         except Exception as e:
             logger.error(f"Ошибка при получении POI для {city}: {e}")
-            data = self._get_mock_poi(city, limit)
-            self._cache[key] = (now, data)
-            return data
+            return self._get_mock_poi(city, limit)
+
+    def _providers(self) -> list:
+        providers = {
+            "foursquare": self._get_poi_from_foursquare,
+            "opentripmap": self._get_poi_from_opentripmap,
+        }
+        deepseek = getattr(self, "_get_poi_from_deepseek", None)
+        if deepseek is not None:
+            providers["deepseek"] = deepseek
+        names = self.health.order(providers) if settings.POI_ADAPTIVE_ORDER else list(providers)
+        return [(name, providers[name]) for name in names if self.health[name].available()]
+
+    async def _call_provider(self, name: str, provider, city: str, limit: int) -> Optional[list]:
+        health = self.health[name]
+        if not health.try_acquire():
+            return None
+        timeout = self._provider_timeouts[name]
+        started = time.monotonic()
+        try:
+            poi_data = await asyncio.wait_for(provider(city, limit), timeout)
+            # None is a failed call, an empty list is a valid "nothing found" answer
+            outcome = "ok" if poi_data else "error" if poi_data is None else "empty"
+        except asyncio.CancelledError:
+            health.release()
+            raise
+        except asyncio.TimeoutError:
+            logger.warning(f"{PROVIDER_LABELS[name]} не ответил за {timeout} с для {city}")
+            poi_data = None
+            outcome = "timeout"
+        except Exception as e:
+            logger.error(f"Ошибка {PROVIDER_LABELS[name]} для {city}: {e}")
+            poi_data = None
+            outcome = "error"
+        elapsed = time.monotonic() - started
+        health.record(poi_data is not None, elapsed)
+        PROVIDER_DURATION.observe(elapsed, provider=name, outcome=outcome)
+        return poi_data
+
+    async def _fetch_sequential(self, city: str, limit: int) -> Tuple[Optional[str], Optional[list]]:
+        answered = False
+        for name, provider in self._providers():
+            poi_data = await self._call_provider(name, provider, city, limit)
+            if poi_data:
+                return name, poi_data
+            answered = answered or poi_data is not None
+        return None, [] if answered else None
+
+    async def _fetch_hedged(self, city: str, limit: int) -> Tuple[Optional[str], Optional[list]]:
+        providers = self._providers()
+        if not providers:
+            return None, None
+        pending = {}
+        launched = 0
+        answered = False
+
+        def launch_next():
+            nonlocal launched
+            name, provider = providers[launched]
+            launched += 1
+            pending[asyncio.create_task(self._call_provider(name, provider, city, limit))] = name
+
+        try:
+            launch_next()
+            while self.hedge_delay <= 0 and launched < len(providers):
+                launch_next()
+
+            while pending:
+                has_next = launched < len(providers)
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=self.hedge_delay if has_next else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    name = pending.pop(task)
+                    poi_data = task.result()
+                    if poi_data:
+                        return name, poi_data
+                    answered = answered or poi_data is not None
+                if has_next:
+                    launch_next()
+            return None, [] if answered else None
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def cache_stats(self) -> dict:
+        return self._cache.stats()
+
+    def sweep_cache(self) -> int:
+        return self._cache.sweep()
+
+    async def close(self):
+        await self.tokens.close()
+
+    def provider_health(self) -> dict:
+        return self.health.snapshot()
+
+    def inflight_stats(self) -> dict:
+        return self._inflight.stats()
 
     async def _get_poi_from_foursquare(self, city: str, limit: int) -> list:
         try:
@@ -94,7 +231,7 @@ class PointsOfInterestService:
                 logger.debug("Foursquare API ключ не установлен")
                 return None
 
-            url = "https://places-api.foursquare.com/places/search"
+            url = f"{settings.FOURSQUARE_BASE_URL}/places/search"
 
             api_key = self.foursquare_api_key.strip()
 
@@ -116,52 +253,53 @@ class PointsOfInterestService:
                 "limit": min(limit, 50)
             }
 
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers, params=params) as response:
-                    response_text = await response.text()
-
-                    if response.status == 200:
-                        try:
-                            data = await response.json()
-                            poi_list = []
-
-                            for place in data.get("results", [])[:limit]:
-                                categories = place.get("categories", [])
-                                category_name = (
-                                    categories[0].get("name", "Достопримечательность")
-                                    if categories else "Достопримечательность"
-                                )
-
-                                rating = place.get("rating")
-                                if rating is not None:
-                                    rating_str = str(rating)
-                                else:
-                                    rating_str = "4.0"
-
-                                poi_list.append({
-                                    "name": place.get("name", "Неизвестное место"),
-                                    "type": category_name,
-                                    "rating": rating_str
-                                })
-
-                            if poi_list:
-                                logger.info(f"Получено {len(poi_list)} POI из Foursquare для {city}")
-                                return poi_list
+            async with self.http.get("foursquare", url, headers=headers, params=params) as response:
+                response_text = await response.text()
+
+                if response.status == 200:
+                    try:
+                        data = await response.json()
+                        poi_list = []
+
+                        for place in data.get("results", [])[:limit]:
+                            categories = place.get("categories", [])
+                            category_name = (
+                                categories[0].get("name", "Достопримечательность")
+                                if categories else "Достопримечательность"
+                            )
+
+                            rating = place.get("rating")
+                            if rating is not None:
+                                rating_str = str(rating)
                             else:
-                                logger.warning(f"Foursquare API вернул пустой список результатов для {city}")
-                                return None
-                        except Exception as json_error:
-                            logger.error(f"Ошибка парсинга JSON ответа Foursquare: {json_error}")
-                            logger.debug(f"Ответ сервера: {response_text[:500]}")
-                            return None
-                    else:
-                        logger.warning(f"Ошибка Foursquare API: HTTP {response.status}")
-                        try:
-                            error_data = await response.json()
-                            logger.error(f"Детали ошибки Foursquare API: {error_data}")
-                        except:
-                            logger.error(f"Тело ответа: {response_text[:500]}")
+                                rating_str = "4.0"
+
+                            poi_list.append({
+                                "name": place.get("name", "Неизвестное место"),
+                                "type": category_name,
+                                "rating": rating_str
+                            })
+
+                        if poi_list:
+                            logger.info(f"Получено {len(poi_list)} POI из Foursquare для {city}")
+                        else:
+                            logger.warning(f"Foursquare API вернул пустой список результатов для {city}")
+                        return poi_list
+                    except Exception as json_error:
+                        logger.error(f"Ошибка парсинга JSON ответа Foursquare: {json_error}")
+                        logger.debug(f"Ответ сервера: {response_text[:500]}")
                         return None
+                elif response.status == 400 and _near_not_geocoded(response_text):
+                    logger.warning(f"Foursquare не нашёл город {city}: {response_text[:200]}")
+                    return []
+                else:
+                    logger.warning(f"Ошибка Foursquare API: HTTP {response.status}")
+                    try:
+                        error_data = await response.json()
+                        logger.error(f"Детали ошибки Foursquare API: {error_data}")
+                    except:
+                        logger.error(f"Тело ответа: {response_text[:500]}")
+                    return None
         except aiohttp.ClientError as e:
             logger.error(f"Ошибка сети при запросе к Foursquare API: {e}")
             return None
@@ -175,53 +313,68 @@ class PointsOfInterestService:
                 logger.debug("OpenTripMap API ключ не установлен")
                 return None
 
-            geocode_url = "https://api.opentripmap.com/0.1/en/places/geoname"
-            geocode_params = {
-                "name": city,
+            coordinates = await self._resolve_coordinates(city)
+            if coordinates is None:
+                logger.info(f"OpenTripMap не знает город {city}")
+                return []
+            lat, lon = coordinates
+
+            poi_url = f"{settings.OPENTRIPMAP_BASE_URL}/places/radius"
+            poi_params = {
+                "radius": 10000,
+                "lon": str(lon),
+                "lat": str(lat),
+                "kinds": "interesting_places",
+                "limit": int(limit),
                 "apikey": self.opentripmap_api_key
             }
 
-            async with aiohttp.ClientSession() as session:
-                async with session.get(geocode_url, params=geocode_params) as response:
-                    if response.status == 200:
-                        geocode_data = await response.json()
-                        if geocode_data and geocode_data.get("lat") is not None and geocode_data.get("lon") is not None:
-                            lat = geocode_data.get("lat")
-                            lon = geocode_data.get("lon")
-
-                            try:
-                                lat_str = str(float(lat))
-                                lon_str = str(float(lon))
-                            except (TypeError, ValueError):
-                                return None
-
-                            poi_url = "https://api.opentripmap.com/0.1/en/places/radius"
-                            poi_params = {
-                                "radius": 10000,
-                                "lon": lon_str,
-                                "lat": lat_str,
-                                "kinds": "interesting_places",
-                                "limit": int(limit),
-                                "apikey": self.opentripmap_api_key
-                            }
-
-                            async with session.get(poi_url, params=poi_params) as poi_response:
-                                if poi_response.status == 200:
-                                    poi_data = await poi_response.json()
-                                    poi_list = []
-                                    for place in poi_data.get("features", [])[:limit]:
-                                        properties = place.get("properties", {})
-                                        poi_list.append({
-                                            "name": properties.get("name", "Неизвестное место"),
-                                            "type": properties.get("kinds", "Достопримечательность").split(",")[0],
-                                            "rating": "4.0"
-                                        })
-                                    return poi_list
-                        return None
+            async with self.http.get("opentripmap", poi_url, params=poi_params) as poi_response:
+                if poi_response.status == 200:
+                    poi_data = await poi_response.json()
+                    poi_list = []
+                    for place in poi_data.get("features", [])[:limit]:
+                        properties = place.get("properties", {})
+                        poi_list.append({
+                            "name": properties.get("name", "Неизвестное место"),
+                            "type": properties.get("kinds", "Достопримечательность").split(",")[0],
+                            "rating": "4.0"
+                        })
+                    return poi_list
+                return None
         except Exception as e:
             logger.error(f"Ошибка OpenTripMap API: {e}")
             return None
 
+    async def _resolve_coordinates(self, city: str) -> Optional[Tuple[float, float]]:
+        coordinates = await self.geocoder.lookup(city)
+        if coordinates is not None:
+            return coordinates
+
+        geocode_url = f"{settings.OPENTRIPMAP_BASE_URL}/places/geoname"
+        geocode_params = {
+            "name": city,
+            "apikey": self.opentripmap_api_key
+        }
+
+        async with self.http.get("opentripmap", geocode_url, params=geocode_params) as response:
+            if response.status == 404:
+                return None
+            if response.status != 200:
+                raise ProviderError(f"геокодирование OpenTripMap: HTTP {response.status}")
+            geocode_data = await response.json()
+
+        if not geocode_data or geocode_data.get("lat") is None or geocode_data.get("lon") is None:
+            return None
+        try:
+            lat = float(geocode_data.get("lat"))
+            lon = float(geocode_data.get("lon"))
+        except (TypeError, ValueError):
+            return None
+
+        await self.geocoder.put(city, lat, lon, source="opentripmap")
+        return lat, lon
+
     # async def _get_poi_from_deepseek(self, city: str, limit: int) -> list:
     #     if not self.deepseek_api_key or not self._deepseek_client:
     #         logger.debug("DeepSeek API ключ не установлен или клиент не инициализирован")
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.config import settings
+from app.repositories import TripRepository
+from app.services.cities import canonical_city, fold_whitespace
+from app.services.points_of_interest import PointsOfInterestService
+from app.services.weather import WeatherService
+from app.utils.ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class PrefetchScheduler:
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        weather_service: WeatherService,
+        poi_service: PointsOfInterestService,
+    ):
+        self.session_factory = session_factory
+        self.weather_service = weather_service
+        self.poi_service = poi_service
+        self.interval = settings.PREFETCH_INTERVAL
+        self.window = timedelta(days=settings.PREFETCH_WINDOW_DAYS)
+        self.batch_size = settings.PREFETCH_BATCH_SIZE
+        self._semaphore = asyncio.Semaphore(settings.PREFETCH_CONCURRENCY)
+        self._limiter = TokenBucket(
+            rate=settings.PREFETCH_RATE_PER_SECOND,
+            capacity=max(1.0, settings.PREFETCH_RATE_PER_SECOND),
+        )
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.warmed = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Ошибка предзагрузки данных для поездок: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def collect_destinations(self) -> list:
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        starts_before = today + self.window
+        destinations = {}
+        after_trip_id = 0
+        while True:
+            async with self.session_factory() as db:
+                rows = await TripRepository(db).list_upcoming_destinations(
+                    today, starts_before, after_trip_id, self.batch_size
+                )
+            for _, destination in rows:
+                destinations.setdefault(canonical_city(destination), fold_whitespace(destination))
+            if len(rows) < self.batch_size:
+                break
+            after_trip_id = rows[-1][0]
+        return list(destinations.values())
+
+    async def run_once(self):
+        cities = await self.collect_destinations()
+        await asyncio.gather(*(self._warm(city) for city in cities))
+        self.runs += 1
+        self.warmed += len(cities)
+        logger.info(f"Предзагружены данные для {len(cities)} направлений")
+
+    async def _warm(self, city: str):
+        async with self._semaphore:
+            try:
+                await self._limiter.acquire()
+                await self.weather_service.get_forecast_series(city)
+                await self._limiter.acquire()
+                await self.weather_service.get_current_weather(city)
+                await self._limiter.acquire()
+                await self.poi_service.get_points_of_interest(city)
+            except Exception as e:
+                logger.warning(f"Не удалось предзагрузить данные для {city}: {e}")
+
+    def stats(self) -> dict:
+        return {"runs": self.runs, "warmed": self.warmed}
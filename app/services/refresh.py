@@ -0,0 +1,52 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundRefresher:
+    def __init__(self, concurrency: int, max_pending: int):
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.max_pending = max_pending
+        self._pending: Dict[Hashable, asyncio.Task] = {}
+        self.scheduled = 0
+        self.deduplicated = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def schedule(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> bool:
+        if key in self._pending:
+            self.deduplicated += 1
+            return False
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return False
+        self.scheduled += 1
+        task = asyncio.create_task(self._run(key, factory))
+        self._pending[key] = task
+        task.add_done_callback(lambda done, key=key: self._pending.pop(key, None))
+        return True
+
+    async def _run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]):
+        async with self._semaphore:
+            try:
+                await factory()
+            except Exception as e:
+                self.failed += 1
+                logger.warning(f"Фоновое обновление кэша для {key} не удалось: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "scheduled": self.scheduled,
+            "deduplicated": self.deduplicated,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    async def close(self):
+        tasks = list(self._pending.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,5 +1,14 @@
+import re
 from datetime import datetime
+from typing import List, Tuple
 from pydantic import ValidationError
+from app.services.cities import canonical_city, fold_whitespace
+
+MAX_TASKS_PER_MESSAGE = 100
+
+# list markers people paste from notes apps: "- ", "• ", "1. ", "2) ", "[ ] ", "[x] ", "☐ ", "✅ "
+_TASK_MARKER = re.compile(r"^(?:(?:[-*•·—–]|\d+[.)])(?:\s+|$))?(?P<check>\[[ xXхХ✓]?\]|[☐☑✅⬜✔])?\s*")
+_DONE_MARKS = {"[x]", "[X]", "[х]", "[Х]", "[✓]", "☑", "✅", "✔"}
 
 def validate_date(date_string: str) -> datetime:
     try:
@@ -8,6 +17,23 @@ def validate_date(date_string: str) -> datetime:
         raise ValueError("Неверный формат даты. Используйте ДД.ММ.ГГГГ")
 
 def validate_destination(destination: str) -> str:
-    if len(destination.strip()) < 2:
+    destination = fold_whitespace(destination)
+    if len(canonical_city(destination)) < 2:
         raise ValueError("Название направления должно содержать минимум 2 символа")
-    return destination.strip()
\ No newline at end of file
+    return destination
+
+def parse_tasks(text: str) -> List[Tuple[str, bool]]:
+    tasks = []
+    seen = set()
+    for line in text.splitlines():
+        marker = _TASK_MARKER.match(line.strip())
+        description = fold_whitespace(line.strip()[marker.end():])
+        if not description or description.casefold() in seen:
+            continue
+        seen.add(description.casefold())
+        tasks.append((description, marker.group("check") in _DONE_MARKS))
+    if not tasks:
+        raise ValueError("Описание задачи не может быть пустым")
+    if len(tasks) > MAX_TASKS_PER_MESSAGE:
+        raise ValueError(f"За один раз можно добавить не больше {MAX_TASKS_PER_MESSAGE} задач")
+    return tasks
@@ -1,89 +1,172 @@
-import aiohttp
 import time
+from typing import NamedTuple, Optional, Sequence
 from app.config import settings
+from app.services.cache import TTLCache
+from app.services.cities import canonical_city, city_query
+from app.services.http import HttpClient
+from app.services.refresh import BackgroundRefresher
+from app.services.singleflight import SingleFlight
+
+
+class ForecastSlot(NamedTuple):
+    dt: int
+    dt_txt: str
+    temperature: float
+    description: str
+    humidity: int
+    wind_speed: float
+
+    def as_weather(self) -> dict:
+        return {
+            "temperature": self.temperature,
+            "description": self.description,
+            "humidity": self.humidity,
+            "wind_speed": self.wind_speed,
+        }
+
+
+def daily_forecast(series: Sequence[ForecastSlot], days: int) -> list:
+    daily_forecasts = []
+    processed_dates = set()
+
+    for slot in series:
+        forecast_date, forecast_time = slot.dt_txt.split()
+
+        if forecast_time == "12:00:00" and forecast_date not in processed_dates:
+            processed_dates.add(forecast_date)
+            daily_forecasts.append({"date": forecast_date, **slot.as_weather()})
+
+            if len(daily_forecasts) >= days:
+                break
+
+    return daily_forecasts
+
 
 class WeatherService:
-    def __init__(self):
+    def __init__(self, http: HttpClient, refresher: BackgroundRefresher):
+        self.http = http
+        self.refresher = refresher
         self.api_key = settings.OPENWEATHER_API_KEY
-        self.base_url = "http://api.openweathermap.org/data/2.5"
-        self._cache = {}
-        self._ttl_seconds = 600
+        self.base_url = settings.OPENWEATHER_BASE_URL
+        self._cache = TTLCache(
+            ttl=settings.WEATHER_CACHE_TTL,
+            hard_ttl=settings.WEATHER_CACHE_HARD_TTL,
+            max_entries=settings.WEATHER_CACHE_MAX_ENTRIES,
+            max_bytes=settings.WEATHER_CACHE_MAX_BYTES,
+        )
+        self._inflight = SingleFlight()
 
     async def get_current_weather(self, city: str) -> dict:
+        key = ("current", canonical_city(city))
+        query = city_query(city)
+        cached = self._get_cached(key, lambda: self._fetch_current_weather(query, key))
+        if cached is not None:
+            return cached
+        from_forecast = self._current_from_forecast(city)
+        if from_forecast is not None:
+            return from_forecast
+        return await self._inflight.do(key, lambda: self._fetch_current_weather(query, key))
+
+    def _get_cached(self, key: tuple, fetch):
+        entry = self._cache.lookup(key)
+        if entry is None:
+            return None
+        value, stale = entry
+        if stale:
+            self.refresher.schedule(key, lambda: self._inflight.do(key, fetch))
+        return value
+
+    async def _fetch_current_weather(self, city: str, key: tuple) -> dict:
         try:
-            cached = self._cache.get(("current", city.lower()))
-            now = time.time()
-            if cached and now - cached[0] < self._ttl_seconds:
-                return cached[1]
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.base_url}/weather",
-                    params={
-                        "q": city,
-                        "appid": self.api_key,
-                        "units": "metric",
-                        "lang": "ru"
+            async with self.http.get(
+                "openweather",
+                f"{self.base_url}/weather",
+                params={
+                    "q": city,
+                    "appid": self.api_key,
+                    "units": "metric",
+                    "lang": "ru"
+                }
+            ) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    result = {
+                        "temperature": data["main"]["temp"],
+                        "description": data["weather"][0]["description"],
+                        "humidity": data["main"]["humidity"],
+                        "wind_speed": data["wind"]["speed"]
                     }
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        result = {
-                            "temperature": data["main"]["temp"],
-                            "description": data["weather"][0]["description"],
-                            "humidity": data["main"]["humidity"],
-                            "wind_speed": data["wind"]["speed"]
-                        }
-                        self._cache[("current", city.lower())] = (now, result)
-                        return result
-                    else:
-                        return {"error": "Не удалось получить данные о погоде"}
+                    self._cache.set(key, result)
+                    return result
+                else:
+                    return {"error": "Не удалось получить данные о погоде"}
         except Exception as e:
             return {"error": f"Ошибка при запросе погоды: {str(e)}"}
 
     async def get_weather_forecast(self, city: str, days: int = 5) -> dict:
+        series = await self.get_forecast_series(city)
+        if isinstance(series, dict):
+            return series
+        return {"forecast": daily_forecast(series, days)}
+
+    async def get_forecast_series(self, city: str):
+        key = ("forecast", canonical_city(city))
+        query = city_query(city)
+        cached = self._get_cached(key, lambda: self._fetch_forecast_series(query, key))
+        if cached is not None:
+            return cached
+        return await self._inflight.do(key, lambda: self._fetch_forecast_series(query, key))
+
+    async def _fetch_forecast_series(self, city: str, key: tuple):
         try:
-            cached = self._cache.get(("forecast", city.lower(), days))
-            now = time.time()
-            if cached and now - cached[0] < self._ttl_seconds:
-                return cached[1]
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.base_url}/forecast",
-                    params={
-                        "q": city,
-                        "appid": self.api_key,
-                        "units": "metric",
-                        "lang": "ru"
-                    }
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        forecast_list = data["list"]
-
-                        daily_forecasts = []
-                        processed_dates = set()
-
-                        for forecast in forecast_list:
-                            forecast_date = forecast["dt_txt"].split()[0]
-                            forecast_time = forecast["dt_txt"].split()[1]
-
-                            if forecast_time == "12:00:00" and forecast_date not in processed_dates:
-                                processed_dates.add(forecast_date)
-                                daily_forecasts.append({
-                                    "date": forecast_date,
-                                    "temperature": forecast["main"]["temp"],
-                                    "description": forecast["weather"][0]["description"],
-                                    "humidity": forecast["main"]["humidity"],
-                                    "wind_speed": forecast["wind"]["speed"]
-                                })
-
-                                if len(daily_forecasts) >= days:
-                                    break
-
-                        result = {"forecast": daily_forecasts}
-                        self._cache[("forecast", city.lower(), days)] = (now, result)
-                        return result
-                    else:
-                        return {"error": "Не удалось получить прогноз погоды"}
+            async with self.http.get(
+                "openweather",
+                f"{self.base_url}/forecast",
+                params={
+                    "q": city,
+                    "appid": self.api_key,
+                    "units": "metric",
+                    "lang": "ru"
+                }
+            ) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    series = tuple(
+                        ForecastSlot(
+                            dt=forecast["dt"],
+                            dt_txt=forecast["dt_txt"],
+                            temperature=forecast["main"]["temp"],
+                            description=forecast["weather"][0]["description"],
+                            humidity=forecast["main"]["humidity"],
+                            wind_speed=forecast["wind"]["speed"],
+                        )
+                        for forecast in data["list"]
+                    )
+                    self._cache.set(key, series)
+                    return series
+                else:
+                    return {"error": "Не удалось получить прогноз погоды"}
         except Exception as e:
-            return {"error": f"Ошибка при запросе прогноза: {str(e)}"}
\ No newline at end of file
+            return {"error": f"Ошибка при запросе прогноза: {str(e)}"}
+
+    def _current_from_forecast(self, city: str) -> Optional[dict]:
+        if settings.WEATHER_CURRENT_FROM_FORECAST_WINDOW <= 0:
+            return None
+        # only an opportunistic check, a missing forecast is not a cache miss
+        series = self._cache.peek(("forecast", canonical_city(city)))
+        if not series:
+            return None
+        now = time.time()
+        slot = min(series, key=lambda s: abs(s.dt - now))
+        if abs(slot.dt - now) > settings.WEATHER_CURRENT_FROM_FORECAST_WINDOW:
+            return None
+        return slot.as_weather()
+
+    def cache_stats(self) -> dict:
+        return self._cache.stats()
+
+    def sweep_cache(self) -> int:
+        return self._cache.sweep()
+
+    def inflight_stats(self) -> dict:
+        return self._inflight.stats()
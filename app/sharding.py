@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import multiprocessing
+import queue
+import signal
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.types import TelegramObject, Update
+
+from app.bot import BotRuntime, seed_geocode_store, set_bot_commands, used_update_types
+from app.config import settings
+from app.database.session import engine
+from app.utils.metrics import registry
+from app.utils.updates import UpdateProcessor, update_owner_id
+from app.web.metrics import start_metrics_server
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_INTERVAL = 1.0
+
+
+class ShardSupervisor:
+    def __init__(self, count: int, queue_size: int):
+        self.count = count
+        self._context = multiprocessing.get_context("spawn")
+        self.queues = [self._context.Queue(maxsize=queue_size) for _ in range(count)]
+        # every slot has a single writer (its shard), so no locks are needed
+        self.processed = self._context.Array("q", count, lock=False)
+        self.heartbeats = self._context.Array("d", count, lock=False)
+        self.sent = [0] * count
+        self.restarts = [0] * count
+        self.processes: List[Optional[multiprocessing.Process]] = [None] * count
+
+    def start(self):
+        for index in range(self.count):
+            self._spawn(index)
+
+    def _spawn(self, index: int):
+        self.heartbeats[index] = time.time()
+        process = self._context.Process(
+            target=run_shard_process,
+            args=(index, self.queues[index], self.processed, self.heartbeats),
+            name=f"shard-{index}",
+        )
+        process.start()
+        self.processes[index] = process
+
+    def shard_for(self, update: Update) -> int:
+        return update_owner_id(update) % self.count
+
+    def submit(self, update: Update) -> bool:
+        index = self.shard_for(update)
+        try:
+            self.queues[index].put_nowait(update.model_dump_json(exclude_unset=True))
+        except queue.Full:
+            return False
+        self.sent[index] += 1
+        return True
+
+    async def dispatch(self, update: Update):
+        index = self.shard_for(update)
+        payload = update.model_dump_json(exclude_unset=True)
+        shard_queue = self.queues[index]
+        try:
+            shard_queue.put_nowait(payload)
+        except queue.Full:
+            # block the polling loop rather than drop the update; Telegram keeps the rest for us
+            logger.warning(f"Очередь шарда {index} переполнена")
+            await asyncio.to_thread(shard_queue.put, payload)
+        self.sent[index] += 1
+
+    def check(self):
+        now = time.time()
+        for index, process in enumerate(self.processes):
+            if process is not None and not process.is_alive():
+                logger.error(f"Шард {index} завершился с кодом {process.exitcode}, перезапуск")
+                self.restarts[index] += 1
+                # whatever the dead shard had accepted is lost, start counting from its last report
+                self.sent[index] = self.processed[index] + self.queues[index].qsize()
+                self._spawn(index)
+            elif now - self.heartbeats[index] > settings.SHARD_HEARTBEAT_TIMEOUT:
+                logger.warning(f"Шард {index} не отвечает {now - self.heartbeats[index]:.0f} с")
+
+    async def monitor(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            self.check()
+            logger.info(f"Состояние шардов: {self.snapshot()}")
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        now = time.time()
+        return [
+            {
+                "shard": index,
+                "pid": process.pid if process else None,
+                "alive": bool(process and process.is_alive()),
+                "depth": max(0, self.sent[index] - self.processed[index]),
+                "processed": self.processed[index],
+                "restarts": self.restarts[index],
+                "heartbeat_age": round(now - self.heartbeats[index], 1),
+            }
+            for index, process in enumerate(self.processes)
+        ]
+
+    async def stop(self, timeout: float = 15):
+        for shard_queue in self.queues:
+            await asyncio.to_thread(shard_queue.put, None)
+        for process in self.processes:
+            if process is None:
+                continue
+            await asyncio.to_thread(process.join, timeout)
+            if process.is_alive():
+                process.terminate()
+
+
+class ShardRouterMiddleware(BaseMiddleware):
+    def __init__(self, supervisor: ShardSupervisor):
+        self.supervisor = supervisor
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        # handlers run in the shard processes, the supervisor only routes
+        await self.supervisor.dispatch(event)
+
+
+async def serve_shard(index: int, shard_queue, processed, heartbeats):
+    bot = Bot(token=settings.BOT_TOKEN)
+    runtime = BotRuntime(bot)
+    processor = UpdateProcessor(runtime.dp, bot, settings.SHARD_QUEUE_SIZE, settings.SHARD_WORKERS)
+
+    async def heartbeat():
+        while True:
+            heartbeats[index] = time.time()
+            processed[index] = processor.processed + processor.failed
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+    # the supervisor keeps METRICS_PORT, shards take the ports after it
+    await runtime.start(
+        prefetch=settings.PREFETCH_ENABLED and index == 0,
+        metrics_port=settings.METRICS_PORT + 1 + index if settings.METRICS_ENABLED else None,
+    )
+    processor.start()
+    beating = asyncio.create_task(heartbeat())
+    logger.info(f"Шард {index} запущен")
+    try:
+        while True:
+            try:
+                payload = await asyncio.to_thread(shard_queue.get, True, HEARTBEAT_INTERVAL)
+            except queue.Empty:
+                continue
+            if payload is None:
+                break
+            await processor.put(Update.model_validate_json(payload, context={"bot": bot}))
+    finally:
+        await processor.close()
+        processed[index] = processor.processed + processor.failed
+        beating.cancel()
+        logger.info(f"Шард {index} остановлен: {processor.stats()}")
+        await runtime.close()
+        await bot.session.close()
+        await engine.dispose()
+
+
+def register_shard_metrics(supervisor: ShardSupervisor):
+    for field, kind in (("depth", "gauge"), ("alive", "gauge"), ("restarts", "counter"), ("heartbeat_age", "gauge")):
+        registry.snapshot(
+            f"shard_{field}",
+            f"Shard {field.replace('_', ' ')} as seen by the supervisor",
+            lambda field=field: [({"shard": str(shard["shard"])}, shard[field]) for shard in supervisor.snapshot()],
+            kind,
+        )
+
+
+def run_shard_process(index: int, shard_queue, processed, heartbeats):
+    logging.basicConfig(level=logging.INFO)
+    # Ctrl+C reaches the whole process group; shards stop when the supervisor tells them to
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(serve_shard(index, shard_queue, processed, heartbeats))
+
+
+async def run_supervisor():
+    bot = Bot(token=settings.BOT_TOKEN)
+    await asyncio.to_thread(seed_geocode_store)
+    supervisor = ShardSupervisor(settings.SHARD_COUNT, settings.SHARD_QUEUE_SIZE)
+    supervisor.start()
+
+    dp = Dispatcher()
+    dp.update.outer_middleware(ShardRouterMiddleware(supervisor))
+
+    await set_bot_commands(bot)
+    await bot.delete_webhook()
+    monitor = asyncio.create_task(supervisor.monitor(settings.SHARD_HEALTH_INTERVAL))
+    metrics_runner = None
+    if settings.METRICS_ENABLED:
+        register_shard_metrics(supervisor)
+        metrics_runner = await start_metrics_server(settings.METRICS_HOST, settings.METRICS_PORT)
+
+    logging.info(f"Бот запущен с {settings.SHARD_COUNT} шардами")
+    try:
+        # sequential handling keeps the routing order equal to the update order
+        await dp.start_polling(bot, handle_as_tasks=False, allowed_updates=used_update_types())
+    finally:
+        monitor.cancel()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await supervisor.stop()
+        logger.info(f"Состояние шардов: {supervisor.snapshot()}")
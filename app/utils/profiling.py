@@ -0,0 +1,221 @@
+import asyncio
+import cProfile
+import itertools
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Optional
+
+from app.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+MODES = ("cprofile", "sampling")
+CONTROL_FILE = "control.json"
+
+# "leave as is" for Profiler.configure, None is a meaningful user_id value
+UNCHANGED = object()
+
+PROFILES_CAPTURED = registry.counter("profiles_captured", "Handler profiles written to disk", ["mode"])
+
+
+class StackSampler:
+    # wall-clock sampling of one thread, time spent waiting in the event loop shows up as select/epoll
+    def __init__(self, interval: float, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def write(self, path: str):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Profiler:
+    def __init__(
+        self,
+        directory: str,
+        sample_rate: float = 0.0,
+        user_id: Optional[int] = None,
+        mode: str = "cprofile",
+        interval: float = 0.005,
+        control_interval: float = 2.0,
+    ):
+        self.directory = directory
+        self.interval = interval
+        self.control_interval = control_interval
+        self.control_path = os.path.join(directory, CONTROL_FILE)
+        self.sample_rate = 0.0
+        self.user_id: Optional[int] = None
+        self.mode = "cprofile"
+        self.enabled = False
+        self.captured = 0
+        self.skipped = 0
+        self.last_path: Optional[str] = None
+        self._busy = False
+        self._sequence = itertools.count(1)
+        self._control_mtime: Optional[float] = None
+        self._watcher: Optional[asyncio.Task] = None
+        self.configure(sample_rate=sample_rate, user_id=user_id, mode=mode)
+
+    def configure(self, sample_rate=UNCHANGED, user_id=UNCHANGED, mode=UNCHANGED):
+        if sample_rate is not UNCHANGED:
+            if not 0 <= sample_rate <= 1:
+                raise ValueError("Доля обновлений должна быть от 0 до 1")
+            self.sample_rate = sample_rate
+        if user_id is not UNCHANGED:
+            self.user_id = user_id
+        if mode is not UNCHANGED:
+            if mode not in MODES:
+                raise ValueError(f"Режим профилирования: {', '.join(MODES)}")
+            self.mode = mode
+        # checked first on every update, keeps the disabled path to a single attribute read
+        self.enabled = self.sample_rate > 0 or self.user_id is not None
+
+    def disable(self):
+        self.configure(sample_rate=0.0, user_id=None)
+
+    # every process of a sharded or multi-process webhook deployment polls the same control file,
+    # so /profile handled by one of them reaches all
+    def publish(self):
+        os.makedirs(self.directory, exist_ok=True)
+        values = {"sample_rate": self.sample_rate, "user_id": self.user_id, "mode": self.mode}
+        temporary = f"{self.control_path}.{os.getpid()}"
+        with open(temporary, "w") as f:
+            json.dump(values, f)
+        os.replace(temporary, self.control_path)
+        self._control_mtime = os.stat(self.control_path).st_mtime
+
+    def apply_control(self) -> bool:
+        try:
+            mtime = os.stat(self.control_path).st_mtime
+        except FileNotFoundError:
+            return False
+        if mtime == self._control_mtime:
+            return False
+        with open(self.control_path) as f:
+            values = json.load(f)
+        self._control_mtime = mtime
+        self.configure(sample_rate=values["sample_rate"], user_id=values["user_id"], mode=values["mode"])
+        logger.info(f"Настройки профилирования обновлены: {self.stats()}")
+        return True
+
+    @staticmethod
+    def reset_control(directory: str):
+        # called once by the launcher, a file left by the previous run must not re-enable profiling
+        try:
+            os.remove(os.path.join(directory, CONTROL_FILE))
+        except FileNotFoundError:
+            pass
+
+    def start(self):
+        if self._watcher is None:
+            self._watcher = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+            await asyncio.gather(self._watcher, return_exceptions=True)
+            self._watcher = None
+
+    async def _watch(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.apply_control)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Не удалось прочитать {self.control_path}: {e}")
+            await asyncio.sleep(self.control_interval)
+
+    def should_profile(self, user_id: Optional[int]) -> bool:
+        if not self.enabled:
+            return False
+        if user_id is None or user_id != self.user_id:
+            if not self.sample_rate or random.random() >= self.sample_rate:
+                return False
+        if self._busy:
+            # cProfile and the sampler see the whole thread, overlapping profiles would be mixed up
+            self.skipped += 1
+            return False
+        return True
+
+    async def profile(self, tag: str, call: Callable[[], Awaitable]):
+        self._busy = True
+        mode = self.mode
+        started = time.strftime("%Y%m%d-%H%M%S")
+        if mode == "sampling":
+            collector = StackSampler(self.interval)
+            collector.start()
+        else:
+            collector = cProfile.Profile()
+            collector.enable()
+        try:
+            return await call()
+        finally:
+            if mode == "sampling":
+                collector.stop()
+            else:
+                collector.disable()
+            self._busy = False
+            await self._save(collector, mode, tag, started)
+
+    async def _save(self, collector, mode: str, tag: str, started: str):
+        extension = "collapsed" if mode == "sampling" else "pstats"
+        name = re.sub(r"[^A-Za-z0-9_.-]+", "_", tag).strip("_") or "update"
+        path = os.path.join(self.directory, f"{started}-{name}-{next(self._sequence)}.{extension}")
+        try:
+            await asyncio.to_thread(self._write, collector, mode, path)
+        except OSError as e:
+            logger.error(f"Не удалось сохранить профиль {path}: {e}")
+            return
+        self.captured += 1
+        self.last_path = path
+        PROFILES_CAPTURED.inc(mode=mode)
+        logger.info(f"Профиль {tag} сохранён в {path}")
+
+    def _write(self, collector, mode: str, path: str):
+        os.makedirs(self.directory, exist_ok=True)
+        if mode == "sampling":
+            collector.write(path)
+        else:
+            collector.dump_stats(path)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "mode": self.mode,
+            "sample_rate": self.sample_rate,
+            "user_id": self.user_id,
+            "captured": self.captured,
+            "skipped": self.skipped,
+            "last_path": self.last_path,
+            "pid": os.getpid(),
+        }
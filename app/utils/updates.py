@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import time
+from typing import List
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiogram.types.update import UpdateTypeLookupError
+
+logger = logging.getLogger(__name__)
+
+
+def update_owner_id(update: Update) -> int:
+    # updates of one user must stay on one consumer, otherwise FSM steps can overtake each other
+    try:
+        event = update.event
+    except UpdateTypeLookupError:
+        return update.update_id
+    user = getattr(event, "from_user", None)
+    if user is not None:
+        return user.id
+    chat = getattr(event, "chat", None)
+    if chat is not None:
+        return chat.id
+    return update.update_id
+
+
+class UpdateProcessor:
+    def __init__(self, dp: Dispatcher, bot: Bot, backlog: int, workers: int, drain_timeout: float = 10):
+        self.dp = dp
+        self.bot = bot
+        self.drain_timeout = drain_timeout
+        # one queue per consumer keeps updates of a user in order while different users run concurrently
+        self._queues: List[asyncio.Queue] = [
+            asyncio.Queue(maxsize=max(1, backlog // workers)) for _ in range(workers)
+        ]
+        self._tasks: List[asyncio.Task] = []
+        self.accepted = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        self.max_lag = 0.0
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._consume(queue)) for queue in self._queues]
+
+    def submit(self, update: Update) -> bool:
+        queue = self._queues[update_owner_id(update) % len(self._queues)]
+        try:
+            queue.put_nowait((time.monotonic(), update))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+        self.accepted += 1
+        return True
+
+    async def put(self, update: Update):
+        queue = self._queues[update_owner_id(update) % len(self._queues)]
+        await queue.put((time.monotonic(), update))
+        self.accepted += 1
+
+    async def _consume(self, queue: asyncio.Queue):
+        while True:
+            received_at, update = await queue.get()
+            self.max_lag = max(self.max_lag, time.monotonic() - received_at)
+            try:
+                await self.dp.feed_update(self.bot, update)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.exception(f"Ошибка обработки обновления {update.update_id}: {e}")
+            finally:
+                queue.task_done()
+
+    async def close(self):
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in self._queues)), self.drain_timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Не обработано {self.backlog()} обновлений при остановке")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def backlog(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+
+    def stats(self) -> dict:
+        return {
+            "backlog": self.backlog(),
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "processed": self.processed,
+            "failed": self.failed,
+            "max_lag": round(self.max_lag, 3),
+        }
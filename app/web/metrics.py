@@ -0,0 +1,161 @@
+import logging
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from aiohttp import web
+
+from app.database.pool import pool_stats
+from app.repositories.trips import destination_cache
+from app.repositories.users import known_users
+from app.services.health import CLOSED, HALF_OPEN, OPEN
+from app.utils.metrics import Registry, registry
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+CACHE_FIELDS = (
+    ("hits", "counter", "Fresh cache hits"),
+    ("stale_hits", "counter", "Stale cache hits served while revalidating"),
+    ("misses", "counter", "Cache misses"),
+    ("evictions", "counter", "Entries evicted by size limits"),
+    ("expirations", "counter", "Entries dropped after their hard TTL"),
+    ("entries", "gauge", "Entries currently cached"),
+    ("bytes", "gauge", "Approximate cache size in bytes"),
+)
+
+
+def export_stats(
+    prefix: str,
+    sources: Dict[str, Callable[[], dict]],
+    label: str,
+    fields: Iterable[Tuple[str, str, str]],
+    target: Registry = registry,
+):
+    for field, kind, documentation in fields:
+        def collect(field=field):
+            return [({label: name}, stats().get(field)) for name, stats in sources.items()]
+
+        target.snapshot(f"{prefix}_{field}", documentation, collect, kind)
+
+
+def register_runtime_metrics(runtime, target: Registry = registry):
+    export_stats(
+        "cache",
+        {
+            "weather": runtime.weather_service.cache_stats,
+            "poi": runtime.poi_service.cache_stats,
+            "destinations": destination_cache.stats,
+        },
+        "cache",
+        CACHE_FIELDS,
+        target,
+    )
+    export_stats(
+        "singleflight",
+        {"weather": runtime.weather_service.inflight_stats, "poi": runtime.poi_service.inflight_stats},
+        "service",
+        (
+            ("calls", "counter", "Upstream fetches requested"),
+            ("deduplicated", "counter", "Fetches joined onto one already in flight"),
+            ("in_flight", "gauge", "Fetches currently in flight"),
+        ),
+        target,
+    )
+    export_stats(
+        "refresh",
+        {"background": runtime.refresher.stats},
+        "queue",
+        (
+            ("pending", "gauge", "Background cache refreshes pending"),
+            ("dropped", "counter", "Refreshes dropped because the queue was full"),
+            ("failed", "counter", "Refreshes that raised"),
+        ),
+        target,
+    )
+    export_stats(
+        "send",
+        {"telegram": runtime.sender.stats},
+        "queue",
+        (
+            ("queued", "gauge", "Outgoing messages waiting for a per-chat slot"),
+            ("waiting_interactive", "gauge", "Interactive sends waiting for the global limit"),
+            ("waiting_background", "gauge", "Background sends waiting for the global limit"),
+            ("sent", "counter", "Telegram send requests made"),
+            ("merged", "counter", "Messages merged into a previous one"),
+            ("retries", "counter", "Retries after RetryAfter"),
+            ("latency_p95", "gauge", "p95 seconds from enqueue to send over the last 1000 sends"),
+        ),
+        target,
+    )
+    export_stats(
+        "known_users",
+        {"users": known_users.stats},
+        "set",
+        (("entries", "gauge", "User ids known to be registered"), ("hits", "counter", "ensure_user calls skipped")),
+        target,
+    )
+    export_stats(
+        "db_pool",
+        {"main": pool_stats.snapshot},
+        "pool",
+        (("checkouts", "counter", "Connections checked out"), ("timeouts", "counter", "Checkouts that timed out")),
+        target,
+    )
+    export_stats(
+        "db_sessions",
+        {"updates": runtime.db_middleware.tracker.snapshot},
+        "scope",
+        (("open", "gauge", "DB sessions currently open"), ("leaked", "counter", "Sessions held past the leak timeout")),
+        target,
+    )
+
+    http_stats = runtime.http_client.stats
+    target.snapshot(
+        "upstream_connections",
+        "Upstream connections by how they were obtained",
+        lambda: [
+            ({"kind": "created"}, http_stats().get("connections_created", 0)),
+            ({"kind": "reused"}, http_stats().get("connections_reused", 0)),
+        ],
+        "counter",
+    )
+
+    health = runtime.poi_service.provider_health
+    target.snapshot(
+        "poi_provider_state",
+        "Circuit breaker state per POI provider (1 for the current state)",
+        lambda: [
+            ({"provider": name, "state": state}, 1 if snapshot["state"] == state else 0)
+            for name, snapshot in health().items()
+            for state in (CLOSED, OPEN, HALF_OPEN)
+        ],
+    )
+    target.snapshot(
+        "poi_provider_success_rate",
+        "Recent success rate per POI provider",
+        lambda: [({"provider": name}, snapshot["success_rate"]) for name, snapshot in health().items()],
+    )
+    target.snapshot(
+        "poi_provider_avg_latency_seconds",
+        "Recent average latency per POI provider",
+        lambda: [({"provider": name}, snapshot["avg_latency"]) for name, snapshot in health().items()],
+    )
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(body=registry.render().encode(), headers={"Content-Type": CONTENT_TYPE})
+
+
+async def start_metrics_server(host: str, port: int) -> Optional[web.AppRunner]:
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError as e:
+        logger.error(f"Не удалось открыть порт метрик {host}:{port}: {e}")
+        await runner.cleanup()
+        return None
+    logger.info(f"Метрики доступны на http://{host}:{port}/metrics")
+    return runner
@@ -0,0 +1,146 @@
+import asyncio
+import hmac
+import logging
+import signal
+from typing import Callable, Optional
+
+from aiohttp import web
+from aiogram import Bot
+from aiogram.types import Update
+from pydantic import ValidationError
+
+from app.bot import BotRuntime, seed_geocode_store, set_bot_commands, used_update_types
+from app.config import settings
+from app.database.session import engine
+from app.sharding import ShardSupervisor, register_shard_metrics
+from app.utils.metrics import registry
+from app.utils.updates import UpdateProcessor
+from app.web.metrics import start_metrics_server
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def create_webhook_app(bot: Bot, submit: Callable[[Update], bool], path: str, secret: Optional[str]) -> web.Application:
+    async def handle_update(request: web.Request) -> web.Response:
+        if secret and not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), secret):
+            return web.Response(status=401)
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": bot})
+        except (ValueError, ValidationError):
+            return web.Response(status=400)
+        if not submit(update):
+            # Telegram retries non-2xx answers later, which is the backpressure we want
+            return web.Response(status=503)
+        return web.Response()
+
+    app = web.Application()
+    app.router.add_post(path, handle_update)
+    return app
+
+
+def stop_event() -> asyncio.Event:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    return stop
+
+
+async def set_webhook(bot: Bot, allowed_updates: list):
+    await set_bot_commands(bot)
+    await bot.set_webhook(
+        url=settings.WEBHOOK_URL.rstrip("/") + settings.WEBHOOK_PATH,
+        secret_token=settings.WEBHOOK_SECRET,
+        allowed_updates=allowed_updates,
+        max_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+    )
+
+
+async def serve_webhook():
+    bot = Bot(token=settings.BOT_TOKEN)
+    runtime = BotRuntime(bot)
+    dp = runtime.dp
+    processor = UpdateProcessor(dp, bot, settings.WEBHOOK_BACKLOG, settings.WEBHOOK_WORKERS)
+    runner = web.AppRunner(
+        create_webhook_app(bot, processor.submit, settings.WEBHOOK_PATH, settings.WEBHOOK_SECRET),
+        access_log=None,
+    )
+    stop = stop_event()
+
+    await runner.setup()
+    try:
+        await runtime.start()
+        registry.snapshot(
+            "webhook_backlog",
+            "Updates accepted by the webhook and not processed yet",
+            lambda: [({}, processor.backlog())],
+        )
+        registry.snapshot(
+            "webhook_rejected",
+            "Updates answered with 503 because the backlog was full",
+            lambda: [({}, processor.rejected)],
+            "counter",
+        )
+        await dp.emit_startup(bot=bot, **dp.workflow_data)
+        processor.start()
+        await web.TCPSite(runner, settings.WEBAPP_HOST, settings.WEBAPP_PORT).start()
+        await set_webhook(bot, dp.resolve_used_update_types())
+        logger.info(f"Webhook слушает {settings.WEBAPP_HOST}:{settings.WEBAPP_PORT}")
+        await stop.wait()
+    finally:
+        await runner.cleanup()
+        await processor.close()
+        logger.info(f"Webhook: {processor.stats()}")
+        await dp.emit_shutdown(bot=bot, **dp.workflow_data)
+        await runtime.close()
+        await bot.session.close()
+        await engine.dispose()
+
+
+async def serve_sharded_webhook(processes: int):
+    # one front process routes updates by user, so a user's updates stay in order on one shard
+    bot = Bot(token=settings.BOT_TOKEN)
+    await asyncio.to_thread(seed_geocode_store)
+    supervisor = ShardSupervisor(processes, settings.SHARD_QUEUE_SIZE)
+    supervisor.start()
+    rejected = 0
+
+    def submit(update: Update) -> bool:
+        nonlocal rejected
+        if supervisor.submit(update):
+            return True
+        rejected += 1
+        return False
+
+    runner = web.AppRunner(
+        create_webhook_app(bot, submit, settings.WEBHOOK_PATH, settings.WEBHOOK_SECRET),
+        access_log=None,
+    )
+    stop = stop_event()
+    monitor = asyncio.create_task(supervisor.monitor(settings.SHARD_HEALTH_INTERVAL))
+    metrics_runner = None
+    try:
+        await runner.setup()
+        if settings.METRICS_ENABLED:
+            register_shard_metrics(supervisor)
+            registry.snapshot(
+                "webhook_rejected",
+                "Updates answered with 503 because the backlog was full",
+                lambda: [({}, rejected)],
+                "counter",
+            )
+            metrics_runner = await start_metrics_server(settings.METRICS_HOST, settings.METRICS_PORT)
+        await web.TCPSite(runner, settings.WEBAPP_HOST, settings.WEBAPP_PORT).start()
+        await set_webhook(bot, used_update_types())
+        logger.info(f"Webhook слушает {settings.WEBAPP_HOST}:{settings.WEBAPP_PORT}, шардов: {processes}")
+        await stop.wait()
+    finally:
+        await runner.cleanup()
+        monitor.cancel()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await supervisor.stop()
+        logger.info(f"Состояние шардов: {supervisor.snapshot()}, отклонено: {rejected}")
+        await bot.session.close()
@@ -0,0 +1,280 @@
+"""Simulate thousands of users walking through the TripCreation and TaskCreation
+conversations at the same time and report where the time goes.
+
+    python -m benchmarks.load --users 2000 --flows 2 --think-time 1.5 --ramp-up 10
+    DB_POOL_SIZE=20 python -m benchmarks.load --users 1000 --database-url postgresql://.../loadtest
+
+Virtual users type one step at a time with random think time between steps through the real
+routers and middlewares. Reported: completed flows per second, per-step latency, cost of every
+FSM storage operation, DB pool waits and statement times. SQLite serialises writers, so use
+--database-url with a throwaway Postgres database to look at real contention.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+
+from aiogram.fsm.storage.base import BaseStorage
+
+from benchmarks.run import CITIES, BOT_TOKEN, Recorder, free_port, percentile, prepare_environment
+from benchmarks.stubs import UpstreamStubs
+from benchmarks.telegram import RecordingSession, UpdateFactory
+
+TRIP_DONE = ("✅ Поездка создана",)
+TASK_DONE = ("✅ Задача добавлена", "✅ Добавлено задач")
+FAILED = "⚠️"
+
+
+class TimedStorage(BaseStorage):
+    def __init__(self, storage: BaseStorage):
+        self.storage = storage
+        self.timings = defaultdict(list)
+
+    async def _timed(self, operation: str, call):
+        started = time.perf_counter()
+        try:
+            return await call
+        finally:
+            self.timings[operation].append(time.perf_counter() - started)
+
+    async def set_state(self, key, state=None):
+        return await self._timed("set_state", self.storage.set_state(key, state))
+
+    async def get_state(self, key):
+        return await self._timed("get_state", self.storage.get_state(key))
+
+    async def set_data(self, key, data):
+        return await self._timed("set_data", self.storage.set_data(key, data))
+
+    async def get_data(self, key):
+        return await self._timed("get_data", self.storage.get_data(key))
+
+    async def update_data(self, key, data):
+        return await self._timed("update_data", self.storage.update_data(key, data))
+
+    async def close(self):
+        await self.storage.close()
+
+    def report(self) -> dict:
+        operations = {}
+        for operation, samples in sorted(self.timings.items()):
+            samples = sorted(samples)
+            operations[operation] = {
+                "count": len(samples),
+                "total": sum(samples),
+                "p50": percentile(samples, 0.50),
+                "p95": percentile(samples, 0.95),
+                "p99": percentile(samples, 0.99),
+            }
+        return operations
+
+
+def statement_totals(histogram) -> dict:
+    totals = defaultdict(lambda: {"count": 0, "total": 0.0})
+    for name, labels, value in histogram.samples():
+        if name.endswith("_count"):
+            totals[labels["operation"]]["count"] = value
+        elif name.endswith("_sum"):
+            totals[labels["operation"]]["total"] = value
+    return totals
+
+
+class VirtualUser:
+    def __init__(self, user_id: int, dp, bot, session: RecordingSession, updates: UpdateFactory, recorder: Recorder, args):
+        self.user_id = user_id
+        self.dp = dp
+        self.bot = bot
+        self.session = session
+        self.updates = updates
+        self.recorder = recorder
+        self.args = args
+        self.rng = random.Random(user_id)
+        self.flows = Counter()
+
+    async def think(self):
+        if self.args.think_time:
+            await asyncio.sleep(self.rng.expovariate(1 / self.args.think_time))
+
+    async def step(self, label: str, text: str) -> str:
+        await self.think()
+        await self.recorder.feed(self.dp, self.bot, label, self.updates.message(self.user_id, text))
+        reply = self.session.last(self.user_id)
+        text = reply.text if reply is not None else ""
+        if text.startswith(FAILED):
+            self.recorder.errors[label] += 1
+        return text
+
+    def finish(self, flow: str, reply: str, expected: tuple) -> bool:
+        done = reply.startswith(expected)
+        self.flows[f"{flow}_completed" if done else f"{flow}_failed"] += 1
+        return done
+
+    async def create_trip(self) -> bool:
+        start = date.today() + timedelta(days=self.rng.randint(1, 120))
+        await self.step("/new_trip", "/new_trip")
+        await self.step("trip:destination", self.rng.choice(self.args.cities))
+        await self.step("trip:start_date", start.strftime("%d.%m.%Y"))
+        await self.step("trip:end_date", (start + timedelta(days=self.rng.randint(1, 14))).strftime("%d.%m.%Y"))
+        reply = await self.step("trip:notes", self.rng.choice(("-", "отель у вокзала", "взять зонт")))
+        return self.finish("trip", reply, TRIP_DONE)
+
+    async def add_tasks(self) -> bool:
+        await self.step("/add_task", "/add_task")
+        sent = self.session.last(self.user_id)
+        keyboard = getattr(sent.reply_markup, "keyboard", None) if sent is not None else None
+        if not keyboard:
+            return self.finish("task", "", TASK_DONE)
+        await self.step("task:trip", self.rng.choice(keyboard)[0].text)
+        count = self.rng.randint(1, self.args.tasks)
+        tasks = "\n".join(f"- задача {index + 1}" for index in range(count))
+        reply = await self.step("task:description", tasks)
+        return self.finish("task", reply, TASK_DONE)
+
+    async def run(self):
+        await self.step("/start", "/start")
+        for _ in range(self.args.flows):
+            if not await self.create_trip():
+                await self.step("/cancel", "/cancel")
+                continue
+            if not await self.add_tasks():
+                await self.step("/cancel", "/cancel")
+
+
+async def run(args, stubs: UpstreamStubs) -> dict:
+    from aiogram import Bot
+
+    from app.bot import BotRuntime
+    from app.database.base import Base
+    from app.database.pool import pool_stats
+    from app.database.queries import QUERY_DURATION
+    from app.database.session import engine
+    import app.database.models  # noqa: F401
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session = RecordingSession(latency=args.telegram_latency, keep_last=4)
+    bot = Bot(token=BOT_TOKEN, session=session)
+    runtime = BotRuntime(bot)
+    storage = TimedStorage(runtime.dp.fsm.storage)
+    runtime.dp.fsm.storage = storage
+    await runtime.start(prefetch=False, metrics_port=None)
+
+    updates = UpdateFactory()
+    recorder = Recorder()
+    users = [
+        VirtualUser(200_000 + index, runtime.dp, bot, session, updates, recorder, args)
+        for index in range(args.users)
+    ]
+    pool_before = pool_stats.snapshot()
+    statements_before = statement_totals(QUERY_DURATION)
+
+    async def arrive(index: int, user: VirtualUser):
+        if args.ramp_up:
+            await asyncio.sleep(args.ramp_up * index / len(users))
+        await user.run()
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(arrive(index, user) for index, user in enumerate(users)))
+        elapsed = time.perf_counter() - started
+    finally:
+        pool_after = pool_stats.snapshot()
+        statements_after = statement_totals(QUERY_DURATION)
+        await runtime.close()
+        await engine.dispose()
+
+    flows = sum((user.flows for user in users), Counter())
+    checkouts = pool_after["checkouts"] - pool_before["checkouts"]
+    waited = pool_after["avg_wait"] * pool_after["checkouts"] - pool_before["avg_wait"] * pool_before["checkouts"]
+    report = recorder.report(elapsed)
+    report["flows"] = dict(flows)
+    report["flows_per_second"] = (flows["trip_completed"] + flows["task_completed"]) / elapsed if elapsed else 0.0
+    report["storage"] = storage.report()
+    report["db_pool"] = {
+        "checkouts": checkouts,
+        "timeouts": pool_after["timeouts"] - pool_before["timeouts"],
+        "avg_wait": waited / checkouts if checkouts else 0.0,
+        "max_wait": pool_after["max_wait"],
+    }
+    report["statements"] = {
+        operation: {
+            "count": totals["count"] - statements_before[operation]["count"],
+            "total": totals["total"] - statements_before[operation]["total"],
+        }
+        for operation, totals in sorted(statements_after.items())
+        if totals["count"] > statements_before[operation]["count"]
+    }
+    report["telegram"] = dict(session.calls)
+    return report
+
+
+def print_report(report: dict):
+    flows = report["flows"]
+    print(
+        f"{report['updates']} updates in {report['elapsed']:.2f}s, {report['throughput']:.1f} updates/s, "
+        f"{report['flows_per_second']:.1f} flows/s"
+    )
+    print(
+        f"trips {flows.get('trip_completed', 0)} completed / {flows.get('trip_failed', 0)} failed, "
+        f"tasks {flows.get('task_completed', 0)} completed / {flows.get('task_failed', 0)} failed"
+    )
+    print(f"\n{'step':<20}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for label, row in report["commands"].items():
+        print(
+            f"{label:<20}{row['count']:>8}{row['errors']:>8}"
+            f"{row['p50'] * 1000:>10.1f}{row['p95'] * 1000:>10.1f}{row['p99'] * 1000:>10.1f}{row['max'] * 1000:>10.1f}"
+        )
+    print(f"\n{'fsm storage':<20}{'count':>8}{'total s':>10}{'p50 µs':>10}{'p95 µs':>10}{'p99 µs':>10}")
+    for operation, row in report["storage"].items():
+        print(
+            f"{operation:<20}{row['count']:>8}{row['total']:>10.3f}"
+            f"{row['p50'] * 1e6:>10.1f}{row['p95'] * 1e6:>10.1f}{row['p99'] * 1e6:>10.1f}"
+        )
+    pool = report["db_pool"]
+    print(
+        f"\ndb pool: {pool['checkouts']} checkouts, {pool['timeouts']} timeouts, "
+        f"avg wait {pool['avg_wait'] * 1000:.2f} ms, max wait {pool['max_wait'] * 1000:.2f} ms"
+    )
+    for operation, row in report["statements"].items():
+        average = row["total"] / row["count"] * 1000 if row["count"] else 0.0
+        print(f"  {operation:<10}{row['count']:>8} statements, {row['total']:.3f}s total, {average:.2f} ms avg")
+    print("telegram:", json.dumps(report["telegram"], sort_keys=True))
+
+
+async def main(args) -> int:
+    logging.basicConfig(level=args.log_level)
+    stubs = UpstreamStubs()
+    with tempfile.TemporaryDirectory(prefix="travel-bot-load-") as workdir:
+        prepare_environment(stubs, free_port(), workdir)
+        if args.database_url:
+            os.environ["DATABASE_URL"] = args.database_url
+        report = await run(args, stubs)
+
+    print_report(report)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000, help="concurrent virtual users")
+    parser.add_argument("--flows", type=int, default=1, help="trip + task conversations per user")
+    parser.add_argument("--tasks", type=int, default=5, help="max tasks sent in one message")
+    parser.add_argument("--think-time", type=float, default=1.0, help="mean seconds between steps")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="seconds over which users arrive")
+    parser.add_argument("--cities", type=lambda value: value.split(","), default=CITIES)
+    parser.add_argument("--telegram-latency", type=float, default=0.0)
+    parser.add_argument("--database-url", help="use this database instead of a throwaway SQLite file")
+    parser.add_argument("--log-level", default="ERROR", help="the pool logs a warning for every slow checkout")
+    parser.add_argument("--save", help="write the report as JSON")
+    sys.exit(asyncio.run(main(parser.parse_args())))
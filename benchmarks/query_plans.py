@@ -0,0 +1,161 @@
+"""Migrate a throwaway Postgres schema, seed it with millions of rows and check
+that the repository queries are served by the indexes the migrations create.
+
+    DATABASE_URL=postgresql://... python -m benchmarks.query_plans --users 100000
+
+Everything lives in its own schema, which is dropped afterwards unless --keep is given.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.config import settings
+from app.database.session import to_async_url
+from app.repositories import TaskRepository, TripRepository
+
+SCHEMA = "query_plan_bench"
+ROOT = Path(__file__).resolve().parent.parent
+
+SEED = [
+    "INSERT INTO users (user_id, first_name) SELECT g, 'user ' || g FROM generate_series(1, CAST(:users AS integer)) g",
+    """
+    INSERT INTO trips (user_id, destination, start_date, end_date)
+    SELECT (g % :users) + 1,
+           'City ' || (g % 5000),
+           timestamp '2020-01-01' + (g % 3650) * interval '1 day',
+           timestamp '2020-01-08' + (g % 3650) * interval '1 day'
+    FROM generate_series(1, CAST(:trips AS integer)) g
+    """,
+    """
+    INSERT INTO tasks (trip_id, description, is_completed)
+    SELECT (g % :trips) + 1, 'task ' || g, g % 3 = 0
+    FROM generate_series(1, CAST(:tasks AS integer)) g
+    """,
+]
+
+
+def plan_nodes(node: dict):
+    yield node
+    for child in node.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def upgrade(connection):
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "alembic"))
+    config.attributes["connection"] = connection
+    command.upgrade(config, "head")
+
+
+async def seed(engine, users: int, trips_per_user: int, tasks_per_trip: int):
+    trips = users * trips_per_user
+    params = {"users": users, "trips": trips, "tasks": trips * tasks_per_trip}
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    # the schema comes from the real migrations, so the checks cover the indexes they create
+    async with engine.connect() as conn:
+        await conn.run_sync(upgrade)
+        await conn.commit()
+    async with engine.begin() as conn:
+        for statement in SEED:
+            started = time.perf_counter()
+            await conn.execute(text(statement), params)
+            print(f"seeded {statement.split()[2]} in {time.perf_counter() - started:.1f}s")
+        await conn.execute(text("SELECT setval(pg_get_serial_sequence('trips', 'trip_id'), :trips)"), params)
+        await conn.execute(text("SELECT setval(pg_get_serial_sequence('tasks', 'task_id'), :tasks)"), params)
+        await conn.execute(text("ANALYZE"))
+
+
+async def capture(engine, session_factory, call) -> list:
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        async with session_factory() as db:
+            await call(db)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+async def explain(engine, statement: str, parameters) -> dict:
+    async with engine.connect() as conn:
+        result = await conn.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters)
+        plan = result.scalar()
+    return (json.loads(plan) if isinstance(plan, str) else plan)[0]
+
+
+async def check(engine, session_factory, user_id: int, trip_id: int) -> bool:
+    cases = [
+        ("list_for_user", lambda db: TripRepository(db).list_for_user(user_id), ["ix_trips_user_id_start_date"]),
+        (
+            "list_with_tasks",
+            lambda db: TripRepository(db).list_with_tasks(user_id),
+            ["ix_trips_user_id_start_date", "ix_tasks_trip_id_task_id"],
+        ),
+        ("list_for_trip", lambda db: TaskRepository(db).list_for_trip(trip_id), ["ix_tasks_trip_id_task_id"]),
+    ]
+    ok = True
+    for name, call, expected in cases:
+        used = set()
+        seq_scans = set()
+        total = 0.0
+        for statement, parameters in await capture(engine, session_factory, call):
+            plan = await explain(engine, statement, parameters)
+            total += plan["Execution Time"]
+            for node in plan_nodes(plan["Plan"]):
+                if "Index Name" in node:
+                    used.add(node["Index Name"])
+                if node["Node Type"] == "Seq Scan":
+                    seq_scans.add(node["Relation Name"])
+        missing = [index for index in expected if index not in used]
+        passed = not missing and not seq_scans
+        ok = ok and passed
+        print(
+            f"{'OK  ' if passed else 'FAIL'} {name:<16} {total:8.2f} ms  indexes={sorted(used)}"
+            + (f"  seq_scan={sorted(seq_scans)}" if seq_scans else "")
+            + (f"  missing={missing}" if missing else "")
+        )
+    return ok
+
+
+async def main(args) -> int:
+    url = to_async_url(args.url)
+    if url.get_backend_name() != "postgresql":
+        print("query plan checks need PostgreSQL", file=sys.stderr)
+        return 2
+    engine = create_async_engine(url, connect_args={"server_settings": {"search_path": SCHEMA}})
+    session_factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        if not args.reuse:
+            await seed(engine, args.users, args.trips_per_user, args.tasks_per_trip)
+        trips = args.users * args.trips_per_user
+        return 0 if await check(engine, session_factory, args.users // 2, trips // 2) else 1
+    finally:
+        if not args.keep:
+            async with engine.begin() as conn:
+                await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=settings.DATABASE_URL)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--trips-per-user", type=int, default=10)
+    parser.add_argument("--tasks-per-trip", type=int, default=3)
+    parser.add_argument("--keep", action="store_true", help="keep the seeded schema")
+    parser.add_argument("--reuse", action="store_true", help="skip seeding and reuse a kept schema")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,257 @@
+"""Drive the bot end to end against local stand-ins for Telegram and every upstream API
+and report throughput and p50/p95/p99 latency per command.
+
+    python -m benchmarks.run --users 200 --save benchmarks/baseline.json
+    python -m benchmarks.run --users 200 --baseline benchmarks/baseline.json --tolerance 0.25
+
+Updates go through Dispatcher.feed_update with the production middlewares and handlers,
+replies are recorded by an in-memory Telegram session, weather and POI requests hit
+aiohttp stubs on localhost and the database is a throwaway SQLite file. With --baseline
+the run exits non-zero when a command got slower (p95) or the run lost throughput by
+more than the tolerance.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+from aiogram.types import Chat, Message
+
+from benchmarks.stubs import PROVIDERS, StubBehaviour, UpstreamStubs
+from benchmarks.telegram import RecordingSession, UpdateFactory
+
+BOT_TOKEN = "123456:BENCHMARKabcdefghijklmnopqrstuvwxyz"
+
+CITIES = [
+    "Москва", "Санкт-Петербург", "Казань", "Сочи", "Калининград", "Париж", "Berlin", "Rome",
+    "Barcelona", "Istanbul", "Тбилиси", "Ереван", "Prague", "Vienna", "Lisbon", "Dubai",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def prepare_environment(stubs: UpstreamStubs, port: int, workdir: str):
+    # settings are read once on import, so everything has to be in place before app is imported
+    os.environ.update(stubs.base_urls(port))
+    os.environ.update({
+        "BOT_TOKEN": BOT_TOKEN,
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}",
+        "GEOCODE_DB_PATH": os.path.join(workdir, "geocode.sqlite3"),
+        "OPENWEATHER_API_KEY": "bench",
+        "AMADEUS_API_KEY": "bench",
+        "AMADEUS_API_SECRET": "bench",
+        "FOURSQUARE_API_KEY": "bench",
+        "OPENTRIPMAP_API_KEY": "bench",
+        "BOT_MODE": "polling",
+        "PREFETCH_ENABLED": "false",
+        "METRICS_ENABLED": "false",
+    })
+    os.environ.pop("DEEPSEEK_API_KEY", None)
+    os.environ.pop("REDIS_URL", None)
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def feed(self, dp, bot, label: str, update):
+        started = time.perf_counter()
+        try:
+            await dp.feed_update(bot, update)
+        except Exception as e:
+            self.errors[label] += 1
+            print(f"{label}: {type(e).__name__}: {e}", file=sys.stderr)
+        self.latencies[label].append(time.perf_counter() - started)
+
+    def report(self, elapsed: float) -> dict:
+        commands = {}
+        for label, samples in sorted(self.latencies.items()):
+            samples = sorted(samples)
+            commands[label] = {
+                "count": len(samples),
+                "errors": self.errors[label],
+                "p50": percentile(samples, 0.50),
+                "p95": percentile(samples, 0.95),
+                "p99": percentile(samples, 0.99),
+                "max": samples[-1],
+            }
+        total = sum(len(samples) for samples in self.latencies.values())
+        return {"elapsed": elapsed, "updates": total, "throughput": total / elapsed if elapsed else 0.0, "commands": commands}
+
+
+def percentile(samples: list, q: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * q))] if samples else 0.0
+
+
+def callback_message(session: RecordingSession, chat_id: int):
+    sent = session.last(chat_id)
+    if sent is None or sent.reply_markup is None or not hasattr(sent.reply_markup, "inline_keyboard"):
+        return None
+    return Message(message_id=1, date=time.time(), chat=Chat(id=chat_id, type="private"), text=sent.text, reply_markup=sent.reply_markup)
+
+
+async def virtual_user(dp, bot, session: RecordingSession, updates: UpdateFactory, recorder: Recorder, user_id: int, args):
+    rng = random.Random(user_id)
+
+    async def feed(label: str, update):
+        # real users do not type faster than the per-chat send pacing lets replies out
+        if args.think_time:
+            await asyncio.sleep(rng.uniform(0.5, 1.5) * args.think_time)
+        await recorder.feed(dp, bot, label, update)
+
+    start = date.today() + timedelta(days=rng.randint(1, 60))
+
+    await feed("/start", updates.message(user_id, "/start"))
+    for _ in range(args.trips):
+        city = rng.choice(args.cities)
+        await feed("/new_trip", updates.message(user_id, "/new_trip"))
+        await feed("trip:destination", updates.message(user_id, city))
+        await feed("trip:start_date", updates.message(user_id, start.strftime("%d.%m.%Y")))
+        await feed("trip:end_date", updates.message(user_id, (start + timedelta(days=5)).strftime("%d.%m.%Y")))
+        await feed("trip:notes", updates.message(user_id, "-"))
+
+    await feed("/add_task", updates.message(user_id, "/add_task"))
+    keyboard = session.last(chat_id=user_id).reply_markup
+    await feed("task:trip", updates.message(user_id, keyboard.keyboard[0][0].text))
+    tasks = "\n".join(f"- задача {index + 1}" for index in range(args.tasks))
+    await feed("task:description", updates.message(user_id, tasks))
+
+    for _ in range(args.rounds):
+        await feed("/my_trips", updates.message(user_id, "/my_trips"))
+        await feed("/tasks", updates.message(user_id, "/tasks"))
+        message = callback_message(session, user_id)
+        if message is not None:
+            data = message.reply_markup.inline_keyboard[1][0].callback_data
+            await feed("task:toggle", updates.callback(user_id, data, message))
+
+        city = rng.choice(args.cities)
+        await feed("/weather", updates.message(user_id, "/weather"))
+        await feed("city:weather", updates.message(user_id, city))
+        await feed("/weather <city>", updates.message(user_id, f"/weather {rng.choice(args.cities)}"))
+        await feed("/forecast <city>", updates.message(user_id, f"/forecast {rng.choice(args.cities)}"))
+        await feed("/top_location <city>", updates.message(user_id, f"/top_location {rng.choice(args.cities)}"))
+
+
+async def run(args, stubs: UpstreamStubs) -> dict:
+    from aiogram import Bot
+
+    from app.bot import BotRuntime
+    from app.database.base import Base
+    from app.database.session import engine
+    import app.database.models  # noqa: F401
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session = RecordingSession(latency=args.telegram_latency)
+    bot = Bot(token=BOT_TOKEN, session=session)
+    runtime = BotRuntime(bot)
+    await runtime.start(prefetch=False, metrics_port=None)
+
+    updates = UpdateFactory()
+    recorder = Recorder()
+    gate = asyncio.Semaphore(args.concurrency)
+
+    async def user(user_id: int):
+        async with gate:
+            await virtual_user(runtime.dp, bot, session, updates, recorder, user_id, args)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(user(100_000 + index) for index in range(args.users)))
+        elapsed = time.perf_counter() - started
+    finally:
+        await runtime.close()
+        await engine.dispose()
+
+    report = recorder.report(elapsed)
+    report["telegram"] = dict(session.calls)
+    report["upstreams"] = stubs.stats()
+    return report
+
+
+def print_report(report: dict):
+    print(f"{report['updates']} updates in {report['elapsed']:.2f}s, {report['throughput']:.1f} updates/s")
+    print(f"{'command':<22}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for label, row in report["commands"].items():
+        print(
+            f"{label:<22}{row['count']:>7}{row['errors']:>8}"
+            f"{row['p50'] * 1000:>10.1f}{row['p95'] * 1000:>10.1f}{row['p99'] * 1000:>10.1f}{row['max'] * 1000:>10.1f}"
+        )
+    print("telegram:", json.dumps(report["telegram"], sort_keys=True))
+    print("upstreams:", json.dumps(report["upstreams"], sort_keys=True))
+
+
+def regressions(report: dict, baseline: dict, tolerance: float, min_delta: float) -> list:
+    found = []
+    if report["throughput"] < baseline["throughput"] * (1 - tolerance):
+        found.append(f"throughput {baseline['throughput']:.1f} -> {report['throughput']:.1f} updates/s")
+    for label, before in baseline["commands"].items():
+        after = report["commands"].get(label)
+        if after is None:
+            found.append(f"{label}: missing from this run")
+            continue
+        if after["errors"] > before["errors"]:
+            found.append(f"{label}: errors {before['errors']} -> {after['errors']}")
+        if after["p95"] > before["p95"] * (1 + tolerance) and after["p95"] - before["p95"] > min_delta:
+            found.append(f"{label}: p95 {before['p95'] * 1000:.1f} -> {after['p95'] * 1000:.1f} ms")
+    return found
+
+
+async def main(args) -> int:
+    behaviour = StubBehaviour(latency=args.upstream_latency, jitter=args.upstream_jitter, error_rate=args.error_rate)
+    stubs = UpstreamStubs({name: behaviour for name in PROVIDERS}, seed=args.seed)
+    port = free_port()
+    with tempfile.TemporaryDirectory(prefix="travel-bot-bench-") as workdir:
+        prepare_environment(stubs, port, workdir)
+        await stubs.start(port)
+        try:
+            report = await run(args, stubs)
+        finally:
+            await stubs.close()
+
+    print_report(report)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        found = regressions(report, baseline, args.tolerance, args.min_delta / 1000)
+        for line in found:
+            print(f"REGRESSION {line}")
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100, help="virtual users")
+    parser.add_argument("--concurrency", type=int, default=50, help="virtual users active at once")
+    parser.add_argument("--rounds", type=int, default=3, help="read-heavy rounds per user")
+    parser.add_argument("--trips", type=int, default=2, help="trips created per user")
+    parser.add_argument("--tasks", type=int, default=5, help="tasks added in one message")
+    parser.add_argument("--cities", type=lambda value: value.split(","), default=CITIES)
+    parser.add_argument("--think-time", type=float, default=1.5, help="mean seconds between a user's messages")
+    parser.add_argument("--upstream-latency", type=float, default=0.05)
+    parser.add_argument("--upstream-jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of upstream requests that fail")
+    parser.add_argument("--telegram-latency", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="write the report as JSON")
+    parser.add_argument("--baseline", help="compare against a saved report")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown")
+    parser.add_argument("--min-delta", type=float, default=2.0, help="ignore p95 changes below this many ms")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,151 @@
+import asyncio
+import random
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from aiohttp import web
+
+PROVIDERS = ("openweather", "foursquare", "opentripmap", "amadeus")
+
+WEATHER_DESCRIPTIONS = ("ясно", "облачно", "небольшой дождь", "переменная облачность", "снег")
+PLACE_KINDS = ("museums", "historic", "architecture", "churches", "gardens_and_parks")
+
+
+@dataclass
+class StubBehaviour:
+    latency: float = 0.05
+    jitter: float = 0.02
+    error_rate: float = 0.0
+    error_status: int = 503
+
+
+def _seed(city: str) -> int:
+    return zlib.crc32(city.strip().lower().encode())
+
+
+class UpstreamStubs:
+    def __init__(self, behaviours: Optional[Dict[str, StubBehaviour]] = None, seed: int = 0):
+        self.behaviours = {name: StubBehaviour() for name in PROVIDERS}
+        self.behaviours.update(behaviours or {})
+        self.random = random.Random(seed)
+        self.requests = Counter()
+        self.errors = Counter()
+        self._runner: Optional[web.AppRunner] = None
+
+    def base_urls(self, port: int, host: str = "127.0.0.1") -> Dict[str, str]:
+        root = f"http://{host}:{port}"
+        return {
+            "OPENWEATHER_BASE_URL": f"{root}/openweather/data/2.5",
+            "FOURSQUARE_BASE_URL": f"{root}/foursquare",
+            "OPENTRIPMAP_BASE_URL": f"{root}/opentripmap/0.1/en",
+            "AMADEUS_BASE_URL": f"{root}/amadeus/v1",
+        }
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/openweather/data/2.5/weather", self._provider("openweather", self.current_weather))
+        app.router.add_get("/openweather/data/2.5/forecast", self._provider("openweather", self.forecast))
+        app.router.add_get("/foursquare/places/search", self._provider("foursquare", self.places_search))
+        app.router.add_get("/opentripmap/0.1/en/places/geoname", self._provider("opentripmap", self.geoname))
+        app.router.add_get("/opentripmap/0.1/en/places/radius", self._provider("opentripmap", self.radius))
+        app.router.add_post("/amadeus/v1/security/oauth2/token", self._provider("amadeus", self.token))
+        return app
+
+    async def start(self, port: int, host: str = "127.0.0.1"):
+        self._runner = web.AppRunner(self.create_app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _provider(self, name: str, handler):
+        async def wrapped(request: web.Request) -> web.Response:
+            behaviour = self.behaviours[name]
+            self.requests[name] += 1
+            delay = max(0.0, behaviour.latency + self.random.uniform(-behaviour.jitter, behaviour.jitter))
+            if delay:
+                await asyncio.sleep(delay)
+            if self.random.random() < behaviour.error_rate:
+                self.errors[name] += 1
+                return web.json_response({"error": "stub failure"}, status=behaviour.error_status)
+            return await handler(request)
+
+        return wrapped
+
+    async def current_weather(self, request: web.Request) -> web.Response:
+        rng = random.Random(_seed(request.query.get("q", "")))
+        return web.json_response({
+            "name": request.query.get("q"),
+            "main": {"temp": round(rng.uniform(-10, 32), 1), "humidity": rng.randint(20, 95)},
+            "weather": [{"description": rng.choice(WEATHER_DESCRIPTIONS)}],
+            "wind": {"speed": round(rng.uniform(0, 12), 1)},
+        })
+
+    async def forecast(self, request: web.Request) -> web.Response:
+        rng = random.Random(_seed(request.query.get("q", "")))
+        start = int(time.time()) // 10800 * 10800
+        slots = []
+        for step in range(40):
+            dt = start + step * 10800
+            slots.append({
+                "dt": dt,
+                "dt_txt": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(dt)),
+                "main": {"temp": round(rng.uniform(-10, 32), 1), "humidity": rng.randint(20, 95)},
+                "weather": [{"description": rng.choice(WEATHER_DESCRIPTIONS)}],
+                "wind": {"speed": round(rng.uniform(0, 12), 1)},
+            })
+        return web.json_response({"cnt": len(slots), "list": slots})
+
+    async def places_search(self, request: web.Request) -> web.Response:
+        near = request.query.get("near", "")
+        rng = random.Random(_seed(near))
+        limit = int(request.query.get("limit", "5"))
+        return web.json_response({
+            "results": [
+                {
+                    "name": f"{near} place {index + 1}",
+                    "categories": [{"name": rng.choice(PLACE_KINDS)}],
+                    "rating": round(rng.uniform(6, 10), 1),
+                }
+                for index in range(limit)
+            ]
+        })
+
+    async def geoname(self, request: web.Request) -> web.Response:
+        rng = random.Random(_seed(request.query.get("name", "")))
+        return web.json_response({
+            "name": request.query.get("name"),
+            "lat": round(rng.uniform(-60, 70), 4),
+            "lon": round(rng.uniform(-180, 180), 4),
+            "status": "OK",
+        })
+
+    async def radius(self, request: web.Request) -> web.Response:
+        rng = random.Random(request.query.get("lat", "") + request.query.get("lon", ""))
+        limit = int(request.query.get("limit", "5"))
+        return web.json_response({
+            "type": "FeatureCollection",
+            "features": [
+                {"properties": {"name": f"Landmark {index + 1}", "kinds": ",".join(rng.sample(PLACE_KINDS, 2))}}
+                for index in range(limit)
+            ],
+        })
+
+    async def token(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        if form.get("grant_type") != "client_credentials":
+            return web.json_response({"error": "invalid_grant"}, status=400)
+        return web.json_response({
+            "access_token": f"stub-{self.random.getrandbits(64):x}",
+            "token_type": "Bearer",
+            "expires_in": 1799,
+        })
+
+    def stats(self) -> dict:
+        return {name: {"requests": self.requests[name], "errors": self.errors[name]} for name in PROVIDERS}
@@ -0,0 +1,92 @@
+import asyncio
+import itertools
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import SendMessage, TelegramMethod
+from aiogram.types import CallbackQuery, Chat, InlineKeyboardMarkup, Message, Update, User
+
+
+class RecordingSession(BaseSession):
+    def __init__(self, latency: float = 0.0, keep_last: int = 20):
+        super().__init__()
+        self.latency = latency
+        self.keep_last = keep_last
+        self.calls = Counter()
+        self.by_chat: Dict[int, List[TelegramMethod]] = defaultdict(list)
+        self._message_ids = itertools.count(1)
+
+    async def make_request(self, bot, method: TelegramMethod, timeout: Optional[int] = None):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.calls[type(method).__name__] += 1
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is not None:
+            history = self.by_chat[chat_id]
+            history.append(method)
+            if len(history) > self.keep_last:
+                del history[0]
+        if isinstance(method, SendMessage):
+            markup = method.reply_markup if isinstance(method.reply_markup, InlineKeyboardMarkup) else None
+            return Message(
+                message_id=next(self._message_ids),
+                date=datetime.now(),
+                chat=Chat(id=method.chat_id, type="private"),
+                text=method.text,
+                reply_markup=markup,
+            )
+        return True
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+    async def close(self):
+        pass
+
+    def last(self, chat_id: int, method_type=SendMessage) -> Optional[TelegramMethod]:
+        for method in reversed(self.by_chat.get(chat_id, ())):
+            if isinstance(method, method_type):
+                return method
+        return None
+
+
+class UpdateFactory:
+    def __init__(self):
+        self._ids = itertools.count(1)
+
+    def _user(self, user_id: int) -> User:
+        return User(id=user_id, is_bot=False, first_name=f"User {user_id}", language_code="ru")
+
+    def message(self, user_id: int, text: str) -> Update:
+        update_id = next(self._ids)
+        return Update(
+            update_id=update_id,
+            message=Message(
+                message_id=update_id,
+                date=datetime.now(),
+                chat=Chat(id=user_id, type="private"),
+                from_user=self._user(user_id),
+                text=text,
+            ),
+        )
+
+    def callback(self, user_id: int, data: str, message: Optional[Message] = None) -> Update:
+        update_id = next(self._ids)
+        message = message or Message(
+            message_id=update_id,
+            date=datetime.now(),
+            chat=Chat(id=user_id, type="private"),
+            text="…",
+        )
+        return Update(
+            update_id=update_id,
+            callback_query=CallbackQuery(
+                id=str(update_id),
+                chat_instance=str(user_id),
+                from_user=self._user(user_id),
+                data=data,
+                message=message,
+            ),
+        )
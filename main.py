@@ -1,55 +1,50 @@
 import asyncio
 import logging
-from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
-from aiogram.types import BotCommand, BotCommandScopeDefault
+from aiogram import Bot
 
+from app.bot import BotRuntime, set_bot_commands
 from app.config import settings
-from app.handlers.start import router as start_router
-from app.handlers.common import router as common_router
-from app.handlers.trips import router as trips_router
-from app.handlers.tasks import router as tasks_router
-from app.handlers.weather import router as weather_router
-from app.handlers.points_of_interest import router as poi_router
-from app.handlers.city_selection import router as city_selection_router
+from app.database.session import engine
+from app.sharding import run_supervisor
+from app.utils.profiling import Profiler
+from app.web.webhook import serve_sharded_webhook, serve_webhook
 
 logging.basicConfig(level=logging.INFO)
 
-async def set_bot_commands(bot: Bot):
-    commands = [
-        BotCommand(command="start", description="🚀 Запустить бота"),
-        BotCommand(command="new_trip", description="🏝️ Создать новую поездку"),
-        BotCommand(command="my_trips", description="🗺️ Мои поездки"),
-        BotCommand(command="add_task", description="📋 Добавить задачу"),
-        BotCommand(command="tasks", description="✅ Мои задачи"),
-        BotCommand(command="weather", description="🌤️ Текущая погода"),
-        BotCommand(command="forecast", description="📅 Прогноз погоды"),
-        BotCommand(command="top_location", description="🏛️ Достопримечательности"),
-    ]
-
-    await bot.set_my_commands(commands, scope=BotCommandScopeDefault())
-
-async def main():
-    if not settings.BOT_TOKEN:
-        logging.error("BOT_TOKEN not found in environment variables")
-        return
-
+async def run_polling():
     bot = Bot(token=settings.BOT_TOKEN)
-    storage = MemoryStorage()
-    dp = Dispatcher(storage=storage)
+    runtime = BotRuntime(bot)
 
     await set_bot_commands(bot)
-
-    dp.include_router(start_router)
-    dp.include_router(common_router)
-    dp.include_router(trips_router)
-    dp.include_router(tasks_router)
-    dp.include_router(city_selection_router)
-    dp.include_router(weather_router)
-    dp.include_router(poi_router)
+    # getUpdates is rejected while a webhook from a previous webhook-mode run is still set
+    await bot.delete_webhook()
+    await runtime.start()
 
     logging.info("Бот запущен и готов к работе!")
-    await dp.start_polling(bot)
+    try:
+        await runtime.dp.start_polling(bot)
+    finally:
+        await runtime.close()
+        await engine.dispose()
+
+def run_webhook():
+    if settings.WEBHOOK_PROCESSES == 1:
+        asyncio.run(serve_webhook())
+    else:
+        asyncio.run(serve_sharded_webhook(settings.WEBHOOK_PROCESSES))
+
+def main():
+    if not settings.BOT_TOKEN:
+        logging.error("BOT_TOKEN not found in environment variables")
+        return
+
+    Profiler.reset_control(settings.PROFILE_DIR)
+    if settings.BOT_MODE == "webhook":
+        run_webhook()
+    elif settings.BOT_MODE == "sharded":
+        asyncio.run(run_supervisor())
+    else:
+        asyncio.run(run_polling())
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    main()
@@ -0,0 +1,8 @@
+import os
+
+# app.config validates the environment on import
+for name in ("BOT_TOKEN", "OPENWEATHER_API_KEY", "AMADEUS_API_KEY", "AMADEUS_API_SECRET", "FOURSQUARE_API_KEY", "OPENTRIPMAP_API_KEY"):
+    os.environ.setdefault(name, "test")
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+os.environ.setdefault("PREFETCH_ENABLED", "false")
+os.environ.setdefault("METRICS_ENABLED", "false")
@@ -0,0 +1,61 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from app.services.auth import EXPIRY_SAFETY_MARGIN, AmadeusTokenManager
+
+
+class FakeResponse:
+    status = 200
+
+    def __init__(self, token: str, expires_in: float):
+        self.token = token
+        self.expires_in = expires_in
+
+    async def json(self):
+        return {"access_token": self.token, "expires_in": self.expires_in}
+
+
+class FakeHttp:
+    def __init__(self, expires_in: float):
+        self.expires_in = expires_in
+        self.calls = 0
+
+    @asynccontextmanager
+    async def post(self, provider, url, **kwargs):
+        self.calls += 1
+        yield FakeResponse(f"token-{self.calls}", self.expires_in)
+
+
+def make_manager(http: FakeHttp, refresh_margin: float) -> AmadeusTokenManager:
+    manager = AmadeusTokenManager(http, "http://amadeus", "id", "secret")
+    manager.refresh_margin = refresh_margin
+    return manager
+
+
+def test_token_close_to_expiry_is_not_reused():
+    async def run():
+        http = FakeHttp(expires_in=EXPIRY_SAFETY_MARGIN + 60)
+        manager = make_manager(http, refresh_margin=30)
+        first = await manager.get_token()
+        manager._expires_at = manager._issued_at + EXPIRY_SAFETY_MARGIN / 2
+        second = await manager.get_token()
+        await manager.close()
+        return first, second
+
+    assert asyncio.run(run()) == ("token-1", "token-2")
+
+
+def test_refresh_loop_keeps_refreshing_in_one_task():
+    async def run():
+        http = FakeHttp(expires_in=0.1)
+        manager = make_manager(http, refresh_margin=1)
+        await manager.get_token()
+        task = manager._refresh_task
+        await asyncio.sleep(0.18)
+        alive = not task.done() and manager._refresh_task is task
+        await manager.close()
+        return http.calls, alive
+
+    calls, alive = asyncio.run(run())
+    assert calls >= 3
+    assert alive
@@ -0,0 +1,113 @@
+import asyncio
+
+from app.services import cache
+from app.services.cache import CacheSweeper, TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(monkeypatch, **kwargs) -> tuple:
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return TTLCache(**kwargs), clock
+
+
+def test_fresh_then_stale_then_expired(monkeypatch):
+    ttl_cache, clock = make_cache(monkeypatch, ttl=10, hard_ttl=30)
+    ttl_cache.set("moscow", 1)
+    assert ttl_cache.lookup("moscow") == (1, False)
+
+    clock.now += 15
+    assert ttl_cache.lookup("moscow") == (1, True)
+    assert ttl_cache.get("moscow") is None
+
+    clock.now += 20
+    assert ttl_cache.lookup("moscow") is None
+    assert len(ttl_cache) == 0
+
+
+def test_per_entry_ttl(monkeypatch):
+    ttl_cache, clock = make_cache(monkeypatch, ttl=10)
+    ttl_cache.set("short", 1, ttl=2)
+    clock.now += 5
+    assert ttl_cache.lookup("short") == (1, True)
+    clock.now += 10
+    assert ttl_cache.lookup("short") is None
+
+
+def test_evicts_least_recently_used(monkeypatch):
+    ttl_cache, _ = make_cache(monkeypatch, ttl=10, max_entries=2)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+    ttl_cache.get("a")
+    ttl_cache.set("c", 3)
+    assert ttl_cache.get("b") is None
+    assert ttl_cache.get("a") == 1
+    assert ttl_cache.stats()["evictions"] == 1
+
+
+def test_sweep_removes_expired(monkeypatch):
+    ttl_cache, clock = make_cache(monkeypatch, ttl=10)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2, ttl=100)
+    clock.now += 50
+    assert ttl_cache.sweep() == 1
+    assert len(ttl_cache) == 1
+
+
+def test_sweeper_clears_idle_caches():
+    async def scenario():
+        idle = TTLCache(ttl=0.01, max_bytes=10_000)
+        idle.set("a", "x" * 100)
+        idle.set("b", "y" * 100)
+        sweeper = CacheSweeper([idle.sweep], interval=0.02)
+        sweeper.start()
+        await asyncio.sleep(0.1)
+        await sweeper.stop()
+        return idle, sweeper
+
+    idle, sweeper = asyncio.run(scenario())
+    assert len(idle) == 0
+    assert idle.stats()["bytes"] == 0
+    assert idle.stats()["misses"] == 0
+    assert sweeper.expired == 2
+    assert sweeper._task is None
+
+
+def test_sweeper_keeps_running_after_a_failed_sweep():
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise RuntimeError("boom")
+
+    async def scenario():
+        sweeper = CacheSweeper([broken], interval=0.01)
+        sweeper.start()
+        await asyncio.sleep(0.08)
+        await sweeper.stop()
+
+    asyncio.run(scenario())
+    assert len(calls) > 1
+
+
+def test_peek_does_not_count_or_reorder(monkeypatch):
+    ttl_cache, clock = make_cache(monkeypatch, ttl=10, hard_ttl=30, max_entries=2)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+    assert ttl_cache.peek("a") == 1
+    assert ttl_cache.peek("missing") is None
+    ttl_cache.set("c", 3)
+    assert ttl_cache.peek("a") is None
+
+    clock.now += 15
+    assert ttl_cache.peek("b") is None
+    stats = ttl_cache.stats()
+    assert (stats["hits"], stats["stale_hits"], stats["misses"]) == (0, 0, 0)
+
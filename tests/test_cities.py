@@ -0,0 +1,33 @@
+import pytest
+
+from app.services.cities import canonicalize, city_query, fold_whitespace
+
+
+@pytest.mark.parametrize(
+    "spelling",
+    ["Москва", "москва", "MOSCOW", "Moskva", "  Москва  "],
+)
+def test_spellings_of_moscow_collapse(spelling):
+    assert canonicalize(spelling) == canonicalize("Moscow")
+
+
+def test_separators_and_accents_are_folded():
+    assert canonicalize("Sankt-Peterburg") == canonicalize("Санкт Петербург")
+    assert canonicalize("São Paulo") == canonicalize("sao paulo")
+
+
+def test_unknown_cities_are_kept_distinct():
+    assert canonicalize("Paris") != canonicalize("Parma")
+
+
+def test_fold_whitespace():
+    assert fold_whitespace("  Нижний \t Новгород ") == "Нижний Новгород"
+
+
+@pytest.mark.parametrize("spelling", ["msk", "Москва", "MOSCOW", "moskau"])
+def test_aliases_query_one_name(spelling):
+    assert city_query(spelling) == "Moscow"
+
+
+def test_unknown_city_query_follows_the_key():
+    assert city_query("São-Paulo") == city_query("sao paulo") == "sao paulo"
@@ -0,0 +1,15 @@
+import pytest
+
+from app.config import Settings
+
+
+@pytest.mark.parametrize(
+    "mode, expected",
+    [("polling", 1), ("sharded", 4), ("webhook", 3)],
+)
+def test_global_send_rate_is_shared_by_sending_processes(mode, expected):
+    config = Settings()
+    config.BOT_MODE = mode
+    config.SHARD_COUNT = 4
+    config.WEBHOOK_PROCESSES = 3
+    assert config.sending_processes() == expected
@@ -0,0 +1,69 @@
+import asyncio
+import sqlite3
+
+from app.services import geocode
+from app.services.geocode import GeocodeStore, seed_from_geonames
+
+
+def geonames_row(geoname_id: int, name: str, alternate: str, lat: float, lon: float, population: int) -> str:
+    columns = [str(geoname_id), name, name, alternate, str(lat), str(lon), "P", "PPL", "US", "", "", "", "", "", str(population)]
+    return "\t".join(columns) + "\n"
+
+
+def test_seed_streams_batches_and_prefers_populous_cities(tmp_path, monkeypatch):
+    monkeypatch.setattr(geocode, "SEED_BATCH_SIZE", 2)
+    dump = tmp_path / "cities.txt"
+    dump.write_text(
+        geonames_row(1, "Springfield", "", 10.0, 10.0, 1000)
+        + geonames_row(2, "Springfield", "", 20.0, 20.0, 50000)
+        + geonames_row(3, "Moscow", "Москва,Moskva", 55.75, 37.62, 10000000),
+        encoding="utf-8",
+    )
+    path = str(tmp_path / "geocode.sqlite3")
+    store = GeocodeStore(path)
+
+    async def run():
+        await store.put("Moscow", 1.0, 1.0, source="opentripmap")
+        seeded = await asyncio.to_thread(seed_from_geonames, path, str(dump))
+        return seeded, await store.lookup("Springfield"), await store.lookup("москва")
+
+    try:
+        seeded, springfield, moscow = asyncio.run(run())
+        assert store.is_seeded()
+    finally:
+        store.close()
+    assert seeded == 3
+    assert springfield == (20.0, 20.0)
+    # coordinates resolved by a provider are never overwritten by the dump
+    assert moscow == (1.0, 1.0)
+
+
+def test_locked_database_does_not_block_the_loop(tmp_path, monkeypatch):
+    path = str(tmp_path / "geocode.sqlite3")
+    store = GeocodeStore(path)
+    blocker = sqlite3.connect(path)
+    blocker.execute("BEGIN EXCLUSIVE")
+
+    async def run():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        await store.put("Paris", 48.85, 2.35, source="opentripmap")
+        ticker.cancel()
+        return ticks, await store.lookup("paris")
+
+    try:
+        ticks, paris = asyncio.run(run())
+    finally:
+        blocker.rollback()
+        blocker.close()
+        store.close()
+    assert ticks > 5
+    assert paris == (48.85, 2.35)
+    assert store.stats()["errors"] == 1
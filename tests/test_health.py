@@ -0,0 +1,65 @@
+from app.services import health
+from app.services.health import CLOSED, HALF_OPEN, OPEN, ProviderHealth, ProviderHealthRegistry
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_health(monkeypatch) -> tuple:
+    clock = Clock()
+    monkeypatch.setattr(health.time, "monotonic", clock)
+    return ProviderHealth("foursquare", window=20, max_age=300, failure_threshold=3, open_seconds=60), clock
+
+
+def test_opens_after_consecutive_failures(monkeypatch):
+    provider, _ = make_health(monkeypatch)
+    for _ in range(2):
+        provider.record(False, 0.1)
+    assert provider.state == CLOSED
+    provider.record(False, 0.1)
+    assert provider.state == OPEN
+    assert not provider.try_acquire()
+
+
+def test_half_open_allows_one_probe(monkeypatch):
+    provider, clock = make_health(monkeypatch)
+    for _ in range(3):
+        provider.record(False, 0.1)
+    clock.now += 61
+    assert provider.try_acquire()
+    assert provider.state == HALF_OPEN
+    assert not provider.try_acquire()
+    provider.record(True, 0.1)
+    assert provider.state == CLOSED
+
+
+def test_failed_probe_reopens(monkeypatch):
+    provider, clock = make_health(monkeypatch)
+    for _ in range(3):
+        provider.record(False, 0.1)
+    clock.now += 61
+    provider.try_acquire()
+    provider.record(False, 0.1)
+    assert provider.state == OPEN
+
+
+def test_success_resets_failure_streak(monkeypatch):
+    provider, _ = make_health(monkeypatch)
+    for ok in (False, False, True, False, False):
+        provider.record(ok, 0.1)
+    assert provider.state == CLOSED
+
+
+def test_registry_orders_by_success_then_latency(monkeypatch):
+    monkeypatch.setattr(health.time, "monotonic", Clock())
+    registry = ProviderHealthRegistry(["foursquare", "opentripmap"], window=20, max_age=300, failure_threshold=3, open_seconds=60)
+    registry["foursquare"].record(True, 2.0)
+    registry["opentripmap"].record(True, 0.1)
+    assert registry.order(["foursquare", "opentripmap"]) == ["opentripmap", "foursquare"]
+    registry["opentripmap"].record(False, 0.1)
+    assert registry.order(["foursquare", "opentripmap"]) == ["foursquare", "opentripmap"]
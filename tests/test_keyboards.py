@@ -0,0 +1,37 @@
+from app.keyboards import build_trip_tasks_pages, remove_task_row, set_task_status
+
+
+def callback_data(markup) -> list:
+    return [[button.callback_data for button in row] for row in markup.inline_keyboard]
+
+
+def test_pages_respect_button_limit_and_repeat_headers():
+    trips = [(1, "Париж", [(task_id, f"задача {task_id}", False) for task_id in range(1, 8)])]
+    pages = build_trip_tasks_pages(trips, max_buttons=7)
+    assert len(pages) == 3
+    for page in pages:
+        assert sum(len(row) for row in page.inline_keyboard) <= 7
+        assert page.inline_keyboard[0][0].callback_data == "trip:view:1"
+
+
+def test_header_without_room_for_a_task_moves_to_next_page():
+    trips = [
+        (1, "Париж", [(1, "a", False), (2, "b", False)]),
+        (2, "Рим", [(3, "c", False)]),
+    ]
+    pages = build_trip_tasks_pages(trips, max_buttons=6)
+    assert callback_data(pages[0])[-1] == ["task:toggle:2", "task:delete:2"]
+    assert callback_data(pages[1])[0] == ["trip:view:2"]
+
+
+def test_set_task_status_only_changes_the_mark():
+    (markup,) = build_trip_tasks_pages([(1, "Париж", [(5, "паспорт", False)])])
+    updated = set_task_status(markup, 5, True)
+    assert updated.inline_keyboard[1][0].text == "✅ паспорт"
+
+
+def test_remove_task_row_drops_empty_headers():
+    (markup,) = build_trip_tasks_pages([(1, "Париж", [(5, "паспорт", False)]), (2, "Рим", [(6, "виза", False)])])
+    updated = remove_task_row(markup, 5)
+    assert callback_data(updated) == [["trip:view:2"], ["task:toggle:6", "task:delete:6"]]
+    assert remove_task_row(updated, 6) is None
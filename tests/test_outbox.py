@@ -0,0 +1,91 @@
+import asyncio
+from datetime import datetime
+
+from aiogram.methods import SendMessage
+from aiogram.types import Chat, Message
+
+from app.services.outbox import BACKGROUND, INTERACTIVE, PriorityGate, SendScheduler, send_in_background, send_priority
+from app.utils.ratelimit import TokenBucket
+
+
+def test_gate_serves_interactive_before_background():
+    async def run():
+        gate = PriorityGate(TokenBucket(rate=100, capacity=1))
+        await gate.acquire(INTERACTIVE)
+        order = []
+
+        async def wait(priority, label):
+            await gate.acquire(priority)
+            order.append(label)
+
+        background = asyncio.create_task(wait(BACKGROUND, "background"))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(wait(INTERACTIVE, "interactive"))
+        await asyncio.gather(background, interactive)
+        gate.close()
+        return order
+
+    assert asyncio.run(run()) == ["interactive", "background"]
+
+
+class PacedBot:
+    def __init__(self, scheduler: SendScheduler):
+        self.scheduler = scheduler
+        self.sent = []
+
+    async def __call__(self, method):
+        return await self.scheduler(self.make_request, self, method)
+
+    async def make_request(self, bot, method):
+        self.sent.append((method.text, send_priority.get()))
+        return Message(message_id=len(self.sent), date=datetime.now(), chat=Chat(id=method.chat_id, type="private"), text=method.text)
+
+
+def test_background_sends_do_not_hold_the_caller():
+    async def run():
+        scheduler = SendScheduler(global_rate=100, chat_rate=20, chat_burst=1)
+        bot = PacedBot(scheduler)
+        task = send_in_background([
+            SendMessage(chat_id=1, text=f"страница {number}").as_(bot) for number in (2, 3, 4)
+        ])
+        # the caller is back before any paced send went out
+        returned_before_send = not bot.sent
+        await task
+        await scheduler.close()
+        return returned_before_send, bot.sent
+
+    returned_before_send, sent = asyncio.run(run())
+    assert returned_before_send
+    assert sent == [("страница 2", BACKGROUND), ("страница 3", BACKGROUND), ("страница 4", BACKGROUND)]
+
+
+def test_only_background_sends_are_merged():
+    async def run(priority):
+        scheduler = SendScheduler(global_rate=100, chat_rate=100, chat_burst=10)
+        bot = PacedBot(scheduler)
+        token = send_priority.set(priority)
+        try:
+            messages = await asyncio.gather(*(bot(SendMessage(chat_id=1, text=text)) for text in ("a", "b", "c")))
+        finally:
+            send_priority.reset(token)
+        await scheduler.close()
+        return [text for text, _ in bot.sent], [message.message_id for message in messages]
+
+    assert asyncio.run(run(INTERACTIVE)) == (["a", "b", "c"], [1, 2, 3])
+    assert asyncio.run(run(BACKGROUND)) == (["a\n\nb\n\nc"], [1, 1, 1])
+
+
+def test_interactive_send_is_not_merged_into_background_batch():
+    async def run():
+        scheduler = SendScheduler(global_rate=100, chat_rate=100, chat_burst=10)
+        bot = PacedBot(scheduler)
+
+        async def send(text, priority):
+            send_priority.set(priority)
+            return await bot(SendMessage(chat_id=1, text=text))
+
+        messages = await asyncio.gather(send("фон", BACKGROUND), send("ответ", INTERACTIVE))
+        await scheduler.close()
+        return [text for text, _ in bot.sent], [message.message_id for message in messages]
+
+    assert asyncio.run(run()) == (["фон", "ответ"], [1, 2])
@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app.config import settings
+from app.services.geocode import GeocodeStore
+from app.services.health import CLOSED, OPEN
+from app.services.http import HttpClient
+from app.services.points_of_interest import PointsOfInterestService
+from app.services.refresh import BackgroundRefresher
+
+PLACES = [{"name": "Кремль", "type": "Крепость", "rating": "4.9"}]
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = PointsOfInterestService(HttpClient(), BackgroundRefresher(1, 10), GeocodeStore(str(tmp_path / "geocode.sqlite3")))
+    service.hedge_delay = 0.01
+    yield service
+    service.geocoder.close()
+
+
+def provider(result, delay: float = 0.0):
+    calls = []
+
+    async def call(city, limit):
+        calls.append(city)
+        await asyncio.sleep(delay)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    call.calls = calls
+    return call
+
+
+@pytest.mark.parametrize("strategy", ["sequential", "hedged"])
+def test_empty_answers_do_not_open_breakers(service, strategy):
+    service.strategy = strategy
+    service._get_poi_from_foursquare = provider([])
+    service._get_poi_from_opentripmap = provider([])
+    for city in ("Qwertyville", "Asdfgh", "Zxcvbn", "Poiuyt"):
+        asyncio.run(service.get_points_of_interest(city))
+    assert service.health["foursquare"].state == CLOSED
+    assert service.health["opentripmap"].state == CLOSED
+
+
+def test_failures_open_breakers_and_fallback_is_not_cached(service):
+    service.strategy = "sequential"
+    service._get_poi_from_foursquare = provider(None)
+    service._get_poi_from_opentripmap = provider(RuntimeError("boom"))
+    for city in ("Paris", "Rome", "Berlin"):
+        asyncio.run(service.get_points_of_interest(city))
+    assert service.health["foursquare"].state == OPEN
+    assert service.health["opentripmap"].state == OPEN
+    assert service.cache_stats()["entries"] == 0
+
+
+def test_empty_answers_cache_the_fallback(service):
+    service.strategy = "sequential"
+    service._get_poi_from_foursquare = provider([])
+    service._get_poi_from_opentripmap = provider([])
+    data = asyncio.run(service.get_points_of_interest("Qwertyville"))
+    assert data == service._get_mock_poi("Qwertyville", 5)
+    assert service.cache_stats()["entries"] == 1
+
+
+def test_sequential_falls_through_to_next_provider(service):
+    service.strategy = "sequential"
+    service._get_poi_from_foursquare = provider([])
+    service._get_poi_from_opentripmap = provider(PLACES)
+    assert asyncio.run(service.get_points_of_interest("Москва")) == PLACES
+
+
+def test_hedged_returns_first_useful_answer(service):
+    service.strategy = "hedged"
+    service._get_poi_from_foursquare = provider(PLACES, delay=0.5)
+    service._get_poi_from_opentripmap = provider(PLACES[::-1] + PLACES)
+    assert asyncio.run(service.get_points_of_interest("Москва")) == PLACES[::-1] + PLACES
+
+
+def test_hedged_without_available_providers(service):
+    service.strategy = "hedged"
+    for name in ("foursquare", "opentripmap"):
+        for _ in range(service.health[name].failure_threshold):
+            service.health[name].record(False, 0.1)
+    assert asyncio.run(service._fetch_hedged("Paris", 5)) == (None, None)
+    assert asyncio.run(service.get_points_of_interest("Paris")) == service._get_mock_poi("Paris", 5)
+
+
+@pytest.mark.parametrize(
+    "body, expected",
+    [
+        ({"message": "Failed to geocode near: Атлантида"}, []),
+        ({"message": "Invalid request: limit must be a positive integer"}, None),
+    ],
+)
+def test_foursquare_400_is_empty_only_for_unknown_city(service, monkeypatch, body, expected):
+    async def places_search(request):
+        return web.json_response(body, status=400)
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/places/search", places_search)
+        async with TestServer(app) as server:
+            monkeypatch.setattr(settings, "FOURSQUARE_BASE_URL", str(server.make_url("")).rstrip("/"))
+            try:
+                return await service._get_poi_from_foursquare("Атлантида", 5)
+            finally:
+                await service.http.close()
+
+    assert asyncio.run(run()) == expected
+
+
+def test_aliases_fetch_the_canonical_query(service):
+    service.strategy = "sequential"
+    service._get_poi_from_foursquare = foursquare = provider(PLACES)
+    for spelling in ("piter", "СПб", "Санкт-Петербург"):
+        assert asyncio.run(service.get_points_of_interest(spelling)) == PLACES
+    assert foursquare.calls == ["Saint Petersburg"]
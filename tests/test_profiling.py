@@ -0,0 +1,54 @@
+import asyncio
+import os
+import pstats
+
+import pytest
+
+from app.utils.profiling import CONTROL_FILE, Profiler
+
+
+def test_configure_leaves_unspecified_settings_alone(tmp_path):
+    profiler = Profiler(str(tmp_path), user_id=42)
+    profiler.configure(sample_rate=0.5)
+    assert (profiler.user_id, profiler.sample_rate) == (42, 0.5)
+    profiler.configure(user_id=None)
+    assert profiler.user_id is None and profiler.enabled
+    profiler.disable()
+    assert not profiler.enabled
+
+
+def test_invalid_settings_are_rejected(tmp_path):
+    profiler = Profiler(str(tmp_path))
+    with pytest.raises(ValueError):
+        profiler.configure(sample_rate=2)
+    with pytest.raises(ValueError):
+        profiler.configure(mode="perf")
+
+
+def test_published_settings_reach_other_processes(tmp_path):
+    admin_process = Profiler(str(tmp_path))
+    other_process = Profiler(str(tmp_path))
+    admin_process.configure(user_id=7, mode="sampling")
+    admin_process.publish()
+
+    assert other_process.apply_control()
+    assert (other_process.user_id, other_process.mode, other_process.enabled) == (7, "sampling", True)
+    assert not other_process.apply_control()
+
+    Profiler.reset_control(str(tmp_path))
+    assert not os.path.exists(tmp_path / CONTROL_FILE)
+
+
+def test_profile_is_written_for_selected_user_only(tmp_path):
+    profiler = Profiler(str(tmp_path), user_id=7)
+    assert not profiler.should_profile(8)
+    assert profiler.should_profile(7)
+
+    async def handler():
+        await asyncio.sleep(0)
+        return "ok"
+
+    assert asyncio.run(profiler.profile("weather-cmd_weather", handler)) == "ok"
+    assert profiler.captured == 1
+    assert profiler.last_path.endswith(".pstats") and "weather-cmd_weather" in profiler.last_path
+    pstats.Stats(profiler.last_path)
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from app.services.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "sunny"
+
+    async def run():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("moscow", fetch) for _ in range(5)))
+        return flight, results
+
+    flight, results = asyncio.run(run())
+    assert results == ["sunny"] * 5
+    assert calls == 1
+    assert flight.stats() == {"calls": 5, "deduplicated": 4, "errors": 0, "in_flight": 0}
+
+
+def test_cancelled_waiter_does_not_cancel_shared_call():
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return 42
+
+    async def run():
+        flight = SingleFlight()
+        first = asyncio.create_task(flight.do("key", fetch))
+        second = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == 42
+
+
+def test_errors_are_propagated_and_forgotten():
+    async def fail():
+        raise RuntimeError("upstream down")
+
+    async def run():
+        flight = SingleFlight()
+        with pytest.raises(RuntimeError):
+            await flight.do("key", fail)
+        return flight.stats()
+
+    stats = asyncio.run(run())
+    assert stats["errors"] == 1
+    assert stats["in_flight"] == 0
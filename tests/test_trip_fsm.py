@@ -0,0 +1,65 @@
+import asyncio
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from app.handlers import trips
+
+
+class JsonStorage(MemoryStorage):
+    # stores FSM data the way RedisStorage does
+    async def set_data(self, key, data):
+        await super().set_data(key, {"raw": json.dumps(data)})
+
+    async def get_data(self, key):
+        stored = await super().get_data(key)
+        return json.loads(stored["raw"]) if stored else {}
+
+
+class FakeMessage:
+    def __init__(self, text: str):
+        self.text = text
+        self.from_user = SimpleNamespace(id=42)
+        self.answers = []
+
+    async def answer(self, text, **kwargs):
+        self.answers.append(text)
+
+
+class FakeTripRepository:
+    def __init__(self):
+        self.created = []
+
+    async def create(self, **kwargs):
+        self.created.append(kwargs)
+
+
+def test_trip_creation_survives_json_storage():
+    async def run():
+        state = FSMContext(JsonStorage(), StorageKey(bot_id=1, chat_id=42, user_id=42))
+        repo = FakeTripRepository()
+        await trips.cmd_new_trip(FakeMessage("/new_trip"), state)
+        await trips.process_destination(FakeMessage("Париж"), state)
+        await trips.process_start_date(FakeMessage("10.06.2026"), state)
+        early = FakeMessage("01.06.2026")
+        await trips.process_end_date(early, state)
+        await trips.process_end_date(FakeMessage("20.06.2026"), state)
+        done = FakeMessage("-")
+        await trips.process_notes(done, state, repo)
+        return repo.created, early.answers, done.answers, await state.get_state()
+
+    created, early_answers, done_answers, final_state = asyncio.run(run())
+    assert "❌" in early_answers[0]
+    assert created == [{
+        "user_id": 42,
+        "destination": "Париж",
+        "start_date": datetime(2026, 6, 10),
+        "end_date": datetime(2026, 6, 20),
+        "notes": None,
+    }]
+    assert "10.06.2026" in done_answers[0]
+    assert final_state is None
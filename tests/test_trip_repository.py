@@ -0,0 +1,67 @@
+import asyncio
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.database.base import Base
+from app.database.models import Trip, User
+from app.repositories import trips
+from app.repositories.trips import TripRepository, destination_cache
+
+
+async def with_sessions(path, scenario):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with sessions() as session:
+        session.add(User(user_id=1, first_name="U"))
+        await session.commit()
+    try:
+        return await scenario(sessions)
+    finally:
+        destination_cache.clear()
+        await engine.dispose()
+
+
+def test_destination_list_is_invalidated_on_commit_not_flush(tmp_path):
+    async def scenario(sessions):
+        async with sessions() as writer, sessions() as reader:
+            assert await TripRepository(reader).list_destinations(1) == ()
+            await TripRepository(writer).create(1, "Париж", datetime(2030, 1, 1), datetime(2030, 1, 5), None)
+            # a concurrent read before the commit must not keep the old list cached
+            await reader.rollback()
+            assert await TripRepository(reader).list_destinations(1) == ()
+            await writer.commit()
+            await reader.rollback()
+            return await TripRepository(reader).list_destinations(1)
+
+    assert asyncio.run(with_sessions(tmp_path / "trips.sqlite3", scenario)) == ("Париж",)
+
+
+def test_rolled_back_trip_does_not_invalidate(tmp_path):
+    async def scenario(sessions):
+        async with sessions() as session:
+            repo = TripRepository(session)
+            await repo.list_destinations(1)
+            await repo.create(1, "Рим", datetime(2030, 1, 1), datetime(2030, 1, 5), None)
+            await session.rollback()
+            return destination_cache.get(1)
+
+    assert asyncio.run(with_sessions(tmp_path / "trips.sqlite3", scenario)) == ()
+
+
+def test_destinations_are_not_cached_with_several_update_processes(tmp_path, monkeypatch):
+    monkeypatch.setattr(trips, "DESTINATION_CACHE_ENABLED", False)
+
+    async def scenario(sessions):
+        async with sessions() as session:
+            assert await TripRepository(session).list_destinations(1) == ()
+        # the trip is written by another process, nothing here gets to invalidate
+        async with sessions() as other:
+            other.add(Trip(user_id=1, destination="Рим", start_date=datetime(2030, 1, 1), end_date=datetime(2030, 1, 5)))
+            await other.commit()
+        async with sessions() as session:
+            return await TripRepository(session).list_destinations(1), destination_cache.get(1)
+
+    assert asyncio.run(with_sessions(tmp_path / "trips.sqlite3", scenario)) == (("Рим",), None)
@@ -0,0 +1,36 @@
+import pytest
+
+from app.services.validators import MAX_TASKS_PER_MESSAGE, parse_tasks
+
+
+def test_single_line_is_one_task():
+    assert parse_tasks("Купить билеты") == [("Купить билеты", False)]
+
+
+def test_bullets_numbers_and_done_marks():
+    text = "- паспорт\n* зарядка\n2. страховка\n[x] виза\n✅ отель"
+    assert parse_tasks(text) == [
+        ("паспорт", False),
+        ("зарядка", False),
+        ("страховка", False),
+        ("виза", True),
+        ("отель", True),
+    ]
+
+
+def test_negative_number_is_not_a_bullet():
+    assert parse_tasks("-5 градусов, взять шапку") == [("-5 градусов, взять шапку", False)]
+
+
+def test_bullet_only_lines_are_skipped():
+    assert parse_tasks("- \n* паспорт\n1.\n•") == [("паспорт", False)]
+
+
+def test_empty_message_is_rejected():
+    with pytest.raises(ValueError):
+        parse_tasks("  \n\n ")
+
+
+def test_too_many_tasks_are_rejected():
+    with pytest.raises(ValueError):
+        parse_tasks("\n".join(f"задача {index}" for index in range(MAX_TASKS_PER_MESSAGE + 1)))
@@ -0,0 +1,37 @@
+import asyncio
+import time
+
+from app.services.cities import canonical_city
+from app.services.weather import ForecastSlot, WeatherService
+
+
+def make_service(monkeypatch) -> tuple:
+    service = WeatherService(http=None, refresher=None)
+    fetched = []
+
+    async def fake_fetch(city, key):
+        fetched.append(city)
+        return {"temperature": 1.0, "description": "ясно", "humidity": 50, "wind_speed": 1.0}
+
+    monkeypatch.setattr(service, "_fetch_current_weather", fake_fetch)
+    return service, fetched
+
+
+def test_forecast_check_is_not_a_cache_miss(monkeypatch):
+    service, fetched = make_service(monkeypatch)
+    asyncio.run(service.get_current_weather("Москва"))
+    assert fetched == ["Moscow"]
+    assert service.cache_stats()["misses"] == 1
+
+
+def test_current_weather_served_from_cached_forecast(monkeypatch):
+    service, fetched = make_service(monkeypatch)
+    now = int(time.time())
+    slot = ForecastSlot(now, "2026-10-18 12:00:00", 5.0, "облачно", 70, 3.0)
+    service._cache.set(("forecast", canonical_city("Москва")), [slot])
+
+    weather = asyncio.run(service.get_current_weather("Москва"))
+    assert weather == slot.as_weather()
+    assert fetched == []
+    stats = service.cache_stats()
+    assert (stats["hits"], stats["misses"]) == (0, 1)
@@ -0,0 +1,57 @@
+import asyncio
+import json
+import queue
+
+from aiogram import Bot
+from aiohttp.test_utils import TestClient, TestServer
+
+from app.sharding import ShardSupervisor
+from app.web.webhook import SECRET_HEADER, create_webhook_app
+
+BOT_TOKEN = "123456:TESTabcdefghijklmnopqrstuvwxyz0123456"
+
+
+def message_update(update_id: int, user_id: int, text: str) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "user"},
+            "text": text,
+        },
+    }
+
+
+def drain(shard_queue) -> list:
+    texts = []
+    while True:
+        try:
+            payload = shard_queue.get(timeout=0.5)
+        except queue.Empty:
+            return texts
+        texts.append(json.loads(payload)["message"]["text"])
+
+
+def test_updates_of_one_user_land_on_one_shard_in_order():
+    supervisor = ShardSupervisor(count=3, queue_size=2)
+
+    async def run():
+        bot = Bot(token=BOT_TOKEN)
+        app = create_webhook_app(bot, supervisor.submit, "/webhook", "secret")
+        statuses = []
+        async with TestClient(TestServer(app)) as client:
+            for update_id, (user_id, text) in enumerate([(7, "a"), (8, "x"), (7, "b"), (7, "c")], start=1):
+                response = await client.post(
+                    "/webhook", json=message_update(update_id, user_id, text), headers={SECRET_HEADER: "secret"}
+                )
+                statuses.append(response.status)
+        await bot.session.close()
+        return statuses
+
+    statuses = asyncio.run(run())
+    # the third update of user 7 does not fit into its shard queue, Telegram will retry it
+    assert statuses == [200, 200, 200, 503]
+    assert drain(supervisor.queues[7 % 3]) == ["a", "b"]
+    assert drain(supervisor.queues[8 % 3]) == ["x"]